@@ -0,0 +1,159 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import argparse
+import json
+import logging
+import os
+import powerflex_write as pfw
+import sys
+import tempfile
+import time
+
+from powerflex_write.simulator import Simulator
+
+"""
+Benchmark end to end write throughput against the simulated drive.
+
+Each case writes a number of drive files through vfd.Writer to a
+Simulator on a pty pair and reports params/s, drives/hour and the
+p50/p99 latency of each write.  Cases cover the file size (the 9 line
+IP template Parse generates, or every programmable PF525 parameter),
+the baud rate and the pacing delay before each write.  Results are
+printed as JSON so runs can be compared for regressions:
+
+    python benchmark.py --baud 9600 19200 --delay 0.1 0 --output bench.json
+"""
+
+SIZES = ("ip", "full")
+
+
+class Var:
+    """
+    Stand in for the tk variables the writer reads
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class Bench:
+    """
+    Headless parent for the writer
+    """
+    def __init__(self, output_dir, port):
+        self.output_dir = Var(output_dir)
+        self.port_val = Var(port)
+        self.log = logging.getLogger("benchmark")
+
+
+def make_file(path, size):
+    """
+    Write a drive file of the requested size, returns
+    the number of parameters in it
+    """
+    if size == "ip":
+        lines = ["128:En Addr Sel:1", "129:En IP Addr Cfg 1:10", "130:En IP Addr Cfg 2:1",
+                 "131:En IP Addr Cfg 3:1", "132:En IP Addr Cfg 4:10", "133:En Subnet Cfg 1:255",
+                 "134:En Subnet Cfg 2:255", "135:En Subnet Cfg 3:255"]
+    else:
+        lines = ["{}:{}:{}".format(p, pfw.parameter_list.PF525[p], 1)
+                 for p in pfw.parameter_list.get_program_parameters("PF525")]
+    with open(path, "w") as f:
+        f.write("*PF525\n")
+        f.write("\n".join(lines) + "\n")
+    return len(lines)
+
+
+def run_case(size, baudrate, delay, drives, latency):
+    """
+    Write the file to the simulator once per drive,
+    returns the results for the case
+    """
+    sim = Simulator("PF525", baudrate=baudrate, latency=latency)
+    port = sim.start()
+    work_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(work_dir, "VFD_Bench.vfd")
+        params = make_file(path, size)
+
+        writer = pfw.vfd.Writer(Bench(work_dir, port))
+        writer.current_dir = work_dir
+        writer.journal = pfw.journal.Journal(os.path.join(work_dir, "journal.jsonl"))
+        writer.baudrate = baudrate
+        writer.delay = delay
+        writer._connect()
+
+        failed = 0
+        start = time.perf_counter()
+        for _ in range(drives):
+            if writer._parse_file(path):
+                failed += 1
+        elapsed = time.perf_counter() - start
+        writer.comm.close()
+    finally:
+        sim.stop()
+        for f in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, f))
+        os.rmdir(work_dir)
+
+    summary = writer.metrics.summary()
+    return {"size": size,
+            "params": params,
+            "baudrate": baudrate,
+            "delay": delay,
+            "drives": drives,
+            "failed": failed,
+            "seconds": elapsed,
+            "params_per_second": params * drives / elapsed,
+            "drives_per_hour": 3600.0 * drives / elapsed,
+            "p50_latency": summary["p50_latency"],
+            "p99_latency": summary["p99_latency"],
+            "sleep_seconds": summary["totals"]["sleep"],
+            "wire_seconds": summary["totals"]["wire"]}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark writing parameters to a simulated drive")
+    arg_parser.add_argument("--size", nargs="+", choices=SIZES, default=list(SIZES))
+    arg_parser.add_argument("--baud", nargs="+", type=int, default=[9600])
+    arg_parser.add_argument("--delay", nargs="+", type=float, default=[0.1])
+    arg_parser.add_argument("--drives", type=int, default=3)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="simulated drive response latency")
+    arg_parser.add_argument("--output", help="file to save the JSON results to, default stdout")
+    args = arg_parser.parse_args()
+
+    results = []
+    for size in args.size:
+        for baudrate in args.baud:
+            for delay in args.delay:
+                results.append(run_case(size, baudrate, delay, args.drives, args.latency))
+
+    report = json.dumps({"version": pfw.__version__, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        sys.stdout.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,9 @@ specific language governing permissions and limitations
 under the License.
 """
 
-import logging
+import atexit
 import os
 import powerflex_write as pfw
-import serial.tools.list_ports
-import subprocess
 import tkinter as tk
 
 from tkinter import filedialog
@@ -44,6 +42,24 @@ class Window(tk.Frame):
         self.output_val = tk.StringVar()
         self.output_val.set("output/")
 
+        self.auto_detect_val = tk.BooleanVar()
+        self.auto_detect_val.set(False)
+
+        self.auto_match_val = tk.BooleanVar()
+        self.auto_match_val.set(False)
+
+        self.broadcast_val = tk.BooleanVar()
+        self.broadcast_val.set(False)
+
+        self.tune_serial_val = tk.BooleanVar()
+        self.tune_serial_val.set(False)
+
+        self.capture_val = tk.BooleanVar()
+        self.capture_val.set(False)
+
+        self.auto_reset_val = tk.BooleanVar()
+        self.auto_reset_val.set(False)
+
         self.files = tk.StringVar()
         self.file_name = self.l5x_file.get()
 
@@ -53,10 +69,19 @@ class Window(tk.Frame):
 
         self.files = self.get_vfd_files() 
 
-        self.log_file = "{}logjammin.log".format(self.output_val.get())
-        logging.basicConfig(filename=self.log_file, filemode="w", format='%(asctime)s - %(message)s')
-        self.log = logging.getLogger()
-        self.log.setLevel(logging.DEBUG)
+        # log through a queue to a new file each run, written by a background thread
+        self.run_log = pfw.run_log.RunLog(self.output_val.get())
+        self.log = self.run_log.start()
+        self.log_file = self.run_log.file_name
+        self.log_viewer = None
+        atexit.register(self.run_log.stop)
+
+        # list com ports in the background, the gui doesn't wait on it
+        self.ports = pfw.ports.PortScanner(self, os.path.join(self.output_val.get(), "ports.json"))
+        self.ports.start()
+
+        self.file_watcher = pfw.file_watcher.FileWatcher(self, self.output_val.get())
+        self.file_watcher.subscribe(self.file_event)
 
         self.frame1 = tk.LabelFrame(self.main, text="Choose L5X")
         self.l5x_entry = tk.Entry(self.frame1, textvariable=self.l5x_file)
@@ -69,12 +94,17 @@ class Window(tk.Frame):
         self.out_lbl = tk.Label(self.frame3, text="Output Dir:")
         self.output_dir = tk.Entry(self.frame3, textvariable=self.output_val)
         self.write_parm = tk.Button(self.frame3, text="Write All Parameter Files", command=self.write_vfd)
+        self.auto_detect = tk.Checkbutton(self.frame3, text="Auto detect drives", variable=self.auto_detect_val)
+        self.auto_match = tk.Checkbutton(self.frame3, text="Match drives to files", variable=self.auto_match_val)
+        self.broadcast = tk.Checkbutton(self.frame3, text="All drives on one bus", variable=self.broadcast_val)
 
         self.frame4 = tk.LabelFrame(self.main, text="Files")
         self.files_list = pfw.enhanced_listbox.EnhancedListbox(self, self.frame4, selectmode="multiple")
 
         self.parser = pfw.parser.Parse(self)
         self.writer = pfw.vfd.Writer(self)
+        self.writer.file_index = self.file_watcher
+        self.cloner = pfw.clone.Cloner(self)
 
         self.init_window()
 
@@ -90,8 +120,14 @@ class Window(tk.Frame):
         # Add file dropdown with exit
         file = tk.Menu(menu)
         file.add_command(label="Open L5X", command=self.file_open)
+        file.add_command(label="Clone Drive", command=self.clone_vfd)
+        file.add_command(label="Estimate Write Time", command=self.estimate_vfd)
         file.add_command(label="Open Log", command=self.open_log)
         file.add_command(label="Refresh Com", command=self.refresh_com)
+        file.add_checkbutton(label="Low Latency Serial", variable=self.tune_serial_val, command=self.tune_serial)
+        file.add_checkbutton(label="Record Serial Traffic", variable=self.capture_val, command=self.capture)
+        file.add_checkbutton(label="Reset Drives After Comm Changes", variable=self.auto_reset_val,
+                             command=self.auto_reset)
         file.add_command(label="Exit", command=self.close)
         menu.add_cascade(label="File", menu=file)
 
@@ -103,17 +139,22 @@ class Window(tk.Frame):
         self.start_vfd['state'] = 'disabled'
 
         # frame for writing VFD parameters
-        self.frame3.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.frame3.pack(fill=tk.BOTH, padx=5, pady=5)
         self.com_lbl.grid(row=0, column=0, pady=2, sticky="e")
         self.com_port.grid(row=0, column=1, pady=2, sticky="w")
 
         self.out_lbl.grid(row=1, column=0, pady=2, stick="e")
         self.output_dir.grid(row=1, column=1, pady=2, sticky="w")
         self.write_parm.grid(row=2, column=0, padx=5, pady=5)
+        self.auto_detect.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        self.auto_match.grid(row=3, column=1, padx=5, sticky="w")
+        self.broadcast.grid(row=4, column=1, padx=5, sticky="w")
 
         self.frame4.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.files_list.pack(fill=tk.BOTH, padx=5, pady=5)
+        self.files_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.refresh_file_list()
+        self.poll_files()
+        self.poll_ports()
 
         self.log.info("GUI - UI Loaded v{}".format(pfw.__version__))
 
@@ -146,42 +187,163 @@ class Window(tk.Frame):
         """
         Clear out our file list, then refresh it
         """
+        self.file_watcher.rescan()
+        self.files = self.file_watcher.sorted_pending()
+        self.writer.queue.sync(self.files)
+        self.show_queue()
+
+    def show_queue(self):
+        """
+        List the files in the order they will be written
+        """
         self.files_list.delete(0, tk.END)
-        self.files = self.get_vfd_files() 
-        for f in self.files:
+        for f in self.writer.queue.ordered():
             self.files_list.insert(tk.END, f)
 
+    def poll_files(self):
+        """
+        Check the output directory for changes, then
+        check again shortly
+        """
+        self.file_watcher.poll()
+        self.main.after(250, self.poll_files)
+
+    def file_event(self, event, name):
+        """
+        Add or remove a single file from the list as
+        they show up or leave the output directory
+        """
+        names = self.files_list.get(0, tk.END)
+        if event == "add" and name not in names:
+            self.writer.queue.add(name)
+            self.files_list.insert(self.writer.queue.ordered().index(name), name)
+        elif event == "remove" and name in names:
+            self.writer.queue.remove(name)
+            self.files_list.delete(names.index(name))
+
     def write_vfd(self):
         """
         Write VFD parameters from generated files
         """
         self.log.info("GUI - Write VFD parameters requested")
-        self.writer.write(self.write_callback)
+        if self.writer.running:
+            self.log.info("GUI - Already writing, ignoring request")
+            return
+        self.writer.auto_detect = self.auto_detect_val.get()
+        self.writer.auto_match = self.auto_match_val.get()
+        self.writer.broadcast = self.broadcast_val.get()
+        self.set_writing(True)
+        try:
+            self.writer.write(self.write_callback)
+        finally:
+            self.set_writing(False)
+
+    def write_files(self, drives):
+        """
+        Write a selection of files as one batch
+        """
+        self.log.info("GUI - Write {} requested".format(drives))
+        if self.writer.running:
+            self.log.info("GUI - Already writing, ignoring request")
+            return
+        self.set_writing(True)
+        try:
+            self.writer.write_batch(drives, self.write_callback)
+        finally:
+            self.set_writing(False)
+
+    def cancel_write(self):
+        """
+        Stop waiting for drives and end the write
+        """
+        self.log.info("GUI - Write cancel requested")
+        self.writer.cancel()
+
+    def set_writing(self, writing):
+        """
+        The write button cancels while a write is running
+        """
+        if writing:
+            self.write_parm.config(text="Cancel", command=self.cancel_write)
+        else:
+            self.write_parm.config(text="Write All Parameter Files", command=self.write_vfd)
+
+    def estimate_vfd(self):
+        """
+        Show how long writing the files should take
+        """
+        self.log.info("GUI - Write time estimate requested")
+        self.writer.dry_run()
+
+    def clone_vfd(self):
+        """
+        Clone a source drive to each of the generated files
+        """
+        self.log.info("GUI - Clone VFD requested")
+        self.cloner.clone_to_files(self.write_callback)
 
     def write_callback(self, name):
         """
         Called each time a drive is successfully written to.
         Delete the name from the list
         """
-        idx = self.files_list.get(0, tk.END).index(name)
-        self.files_list.delete(idx)
+        names = self.files_list.get(0, tk.END)
+        if name in names:
+            self.files_list.delete(names.index(name))
 
     def refresh_com(self):
         """
-        update our com port combo box with available
-        ports
+        Have the port scanner list the com ports now,
+        poll_ports fills in the combo box
         """
         self.log.info("GUI - Refreshing com ports")
-        ports = serial.tools.list_ports.comports()
-        stuff = []
-        for port, desc, hwid in sorted(ports):
-            self.log.info("GUI - Found COM port: {}".format(port))
-            stuff.append(port)
-        self.com_port["values"] = stuff
-        try:
-            self.com_port.current(len(ports)-1)
-        except (Exception, ):
-            self.log.info("GUI - Failed to refresh com ports")
+        self.ports.refresh()
+
+    def poll_ports(self):
+        """
+        Update our com port combo box when the ports
+        change, then check again shortly
+        """
+        ports = self.ports.updated()
+        if ports is not None:
+            for port in ports:
+                self.log.info("GUI - Found COM port: {} {} {}".format(port.device, port.description,
+                                                                     port.fingerprint or ""))
+            self.com_port["values"] = [p.device for p in ports]
+            # keep a typed in tcp:// or sim:// port
+            port = self.port_val.get()
+            if port not in self.com_port["values"] and "://" not in port:
+                self.port_val.set(self.ports.choose())
+        self.main.after(250, self.poll_ports)
+
+    def auto_reset(self):
+        """
+        Turn on or off resetting drives whose new comm
+        settings only take effect after a reset
+        """
+        self.log.info("GUI - Reset drives after comm changes {}".format(self.auto_reset_val.get()))
+        self.writer.auto_reset = self.auto_reset_val.get()
+
+    def tune_serial(self):
+        """
+        Turn serial tuning on or off, it's applied
+        the next time the port is opened
+        """
+        self.log.info("GUI - Low latency serial {}".format(self.tune_serial_val.get()))
+        self.writer.tune_serial = self.tune_serial_val.get()
+        if self.writer.comm is not None:
+            self.writer.comm.close()
+            self.writer.comm = None
+
+    def capture(self):
+        """
+        Start or stop recording every frame to a capture file
+        """
+        if self.capture_val.get():
+            self.log.info("GUI - Recording serial traffic to {}".format(self.writer.start_capture()))
+        else:
+            self.log.info("GUI - Stopped recording serial traffic")
+            self.writer.stop_capture()
 
     def get_vfd_files(self):
         """
@@ -198,10 +360,14 @@ class Window(tk.Frame):
 
     def open_log(self):
         """
-        Open log file from menu
+        Show the log window from menu, it follows
+        the log as the run goes
         """
-        self.log.info("GUI - Opening log file with notepad")
-        subprocess.call(["notepad.exe", self.log_file])
+        self.log.info("GUI - Opening log viewer")
+        if self.log_viewer and self.log_viewer.winfo_exists():
+            self.log_viewer.lift()
+        else:
+            self.log_viewer = pfw.log_viewer.LogViewer(self, self.log_file)
 
     def close(self):
         """
@@ -212,7 +378,8 @@ class Window(tk.Frame):
 
 
 root = tk.Tk()
-root.geometry("460x360")
-root.resizable(False, False)
+# taller for the drive option rows, resizing grows the file list
+root.geometry("460x440")
+root.minsize(460, 440)
 app = Window(root)
 root.mainloop()
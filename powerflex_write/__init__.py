@@ -1,6 +1,27 @@
 __version_info__ = (2024, 5, 21)
 __version__ = '.'.join(str(x) for x in __version_info__)
 
+from powerflex_write import capture
+from powerflex_write import clone
+from powerflex_write import drive_queue
 from powerflex_write import enhanced_listbox
+from powerflex_write import estimate
+from powerflex_write import file_watcher
+from powerflex_write import fleet
+from powerflex_write import frame_cache
+from powerflex_write import hotplug
+from powerflex_write import identify
+from powerflex_write import journal
+from powerflex_write import log_viewer
+from powerflex_write import metrics
+from powerflex_write import param_store
 from powerflex_write import parser
-from powerflex_write import vfd
\ No newline at end of file
+from powerflex_write import planner
+from powerflex_write import ports
+from powerflex_write import retry
+from powerflex_write import rtu
+from powerflex_write import run_log
+from powerflex_write import serial_tuning
+from powerflex_write import transport
+from powerflex_write import vfd
+from powerflex_write import vfd_diff
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import struct
+import threading
+import time
+
+
+"""
+Record the frames a writer sends and gets back, and play them back as
+a fake drive.
+
+A capture file is a header followed by one record per frame:
+    header  b'PFWC', version, wall clock start time, baud rate
+    record  nanoseconds since the start, direction, length, frame
+A request with no answer is followed by an empty response, a broadcast
+by nothing.  The file is written as the run goes, so a capture from a
+run that crashed can still be read.
+
+Transports record through record(capture), for a serial port the
+pyserial object is wrapped in CaptureSerial, so the frames are the
+bytes minimalmodbus actually wrote and read.  replay.ReplaySlave plays
+a capture back.
+"""
+
+MAGIC = b'PFWC'
+VERSION = 1
+HEADER = struct.Struct('<4sBdI')
+RECORD = struct.Struct('<QBH')
+
+REQUEST = 0
+RESPONSE = 1
+
+
+class Capture:
+
+    def __init__(self, file_name, baudrate=9600):
+        self.file_name = file_name
+        self.baudrate = baudrate
+
+        self.file = None
+        self.start = None
+        self.frames = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        self.file = open(self.file_name, 'wb')
+        self.start = time.perf_counter_ns()
+        self.file.write(HEADER.pack(MAGIC, VERSION, time.time(), self.baudrate))
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def record(self, direction, frame):
+        """
+        Add a frame, timestamped now
+        """
+        if self.file is None:
+            return
+        with self._lock:
+            self.file.write(RECORD.pack(time.perf_counter_ns() - self.start, direction, len(frame)) + frame)
+            self.file.flush()
+            self.frames += 1
+
+
+def read(file_name):
+    """
+    Read a capture, returns (start time, baud rate,
+    [(nanoseconds, direction, frame)])
+    """
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    magic, version, started, baudrate = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("{} isn't a version {} capture".format(file_name, VERSION))
+
+    frames = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        ns, direction, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        frames.append((ns, direction, data[offset:offset + length]))
+        offset += length
+    return started, baudrate, frames
+
+
+def exchanges(frames):
+    """
+    Pair each request with its response, returns a list of (request,
+    response, seconds to the response), response is None when there
+    wasn't one
+    """
+    pairs = []
+    for i, (ns, direction, frame) in enumerate(frames):
+        if direction != REQUEST:
+            continue
+        if i + 1 < len(frames) and frames[i + 1][1] == RESPONSE:
+            answer = frames[i + 1]
+            pairs.append((frame, answer[2] or None, (answer[0] - ns) / 1e9))
+        else:
+            pairs.append((frame, None, 0.0))
+    return pairs
+
+
+def dump(file_name):
+    """
+    Text listing of a capture, one frame per line
+    """
+    started, baudrate, frames = read(file_name)
+    lines = ["Started {}, {} baud, {} frames".format(time.ctime(started), baudrate, len(frames))]
+    for ns, direction, frame in frames:
+        lines.append("{:12.6f} {} {}".format(ns / 1e9, "->" if direction == REQUEST else "<-",
+                                             frame.hex(" ") if frame else "(no answer)"))
+    return "\n".join(lines)
+
+
+class CaptureSerial:
+    """
+    Stands in for a pyserial port, recording what's written and read
+    """
+
+    def __init__(self, serial_port, capture):
+        self.__dict__["serial"] = serial_port
+        self.__dict__["capture"] = capture
+
+    def write(self, data):
+        self.capture.record(REQUEST, bytes(data))
+        return self.serial.write(data)
+
+    def read(self, size=1):
+        data = self.serial.read(size)
+        self.capture.record(RESPONSE, bytes(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.serial, name)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            self.__dict__[name] = value
+        else:
+            setattr(self.serial, name, value)
@@ -0,0 +1,208 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import os
+
+from powerflex_write import journal
+from powerflex_write import parameter_list
+from powerflex_write import vfd_diff
+from tkinter import messagebox
+
+"""
+Clone the parameters of one drive to many drives.
+
+The source drive is read once, every programmable parameter for the
+model is cached in memory.  Each target drive then gets the cached set
+written with batched writes, only the IP address and node address are
+changed for each target.
+
+Targets are tuples of (name, ip address, node address), the IP address
+is a dotted string and either can be None to keep the source value.
+Calling clone_to_files will build the targets from the .vfd files in
+the output directory, the same files Parse generates.
+"""
+
+
+class Cloner:
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.writer = self.parent.writer
+
+        self.model = ""
+        self.source = []
+
+    def clone(self, model, targets, callback=None):
+        """
+        Read the source drive, then write the parameters to each
+        of the targets.  Returns the list of targets that failed.
+        """
+        if not self.writer._start():
+            return list(targets)
+        try:
+            return self._clone(model, targets, callback)
+        finally:
+            self.writer.running = False
+
+    def _clone(self, model, targets, callback):
+        failed = []
+        if not self.writer.comm and not self.writer._connect():
+            messagebox.showinfo("Information", "Failed to open {}!".format(self.writer.com_port))
+            return list(targets)
+
+        messagebox.showinfo("Information", "Connect to the source {} then press OK to continue".format(model))
+        if not self.read_source(model):
+            messagebox.showinfo("Information", "Failed to read the source drive!")
+            return list(targets)
+
+        for target in targets:
+            name = target[0]
+            self.parent.log.info("Cloner - Waiting to connect to {}".format(name))
+            messagebox.showinfo("Information", "Connect to {} then press OK to continue".format(name))
+
+            if self.write_target(*target):
+                self.parent.log.info("Cloner - Failed to write to {}".format(name))
+                failed.append(target)
+            elif callback:
+                callback(target)
+
+        self.parent.log.info("Cloner - Finished cloning, {} of {} failed".format(len(failed), len(targets)))
+        messagebox.showinfo("Information", "Cloning complete!")
+        return failed
+
+    def clone_to_files(self, callback):
+        """
+        Clone to each of the pending .vfd files, taking the model,
+        IP address and node address from the file.  Files that
+        complete are moved to the completed directory, like a
+        normal write.
+        """
+        if not self.writer._start():
+            return
+        try:
+            self._clone_to_files(callback)
+        finally:
+            self.writer.running = False
+
+    def _clone_to_files(self, callback):
+        targets = []
+        models = set()
+        for drive in self.writer._get_text_files():
+            path = os.path.abspath(self.writer.current_dir + '/' + drive)
+            try:
+                model, plan = self.writer._compile_file(path)
+            except (OSError, ValueError, IndexError) as e:
+                self.parent.log.info("Cloner - Skipping {}, failed to read it, {}".format(drive, e))
+                continue
+            models.add(model)
+            targets.append((drive, self._ip_from_plan(model, plan), self._node_from_plan(model, plan)))
+
+        if not targets:
+            messagebox.showinfo("Information", "No files to write!")
+            return
+        if len(models) > 1:
+            self.parent.log.info("Cloner - Files are for different models {}".format(sorted(models)))
+            messagebox.showinfo("Information", "Files must all be for the same drive model to clone!")
+            return
+
+        self.writer.callback = callback
+
+        def done(target):
+            drive = target[0]
+            digest = self.writer._digest(os.path.join(self.writer.current_dir, drive))
+            self.writer.journal.drive(drive, journal.COMPLETED, digest)
+            self.writer._complete(drive)
+
+        self._clone(models.pop(), targets, done)
+
+    def read_source(self, model):
+        """
+        Read every programmable parameter from the connected drive
+        into the cache.  Parameters the drive refuses are skipped.
+        """
+        self.model = model
+        self.source = []
+        parameters = parameter_list.get_program_parameters(model)
+        if not parameters:
+            self.parent.log.info("Cloner - Unknown drive model {}".format(model))
+            return False
+
+        self.parent.log.info("Cloner - Reading {} parameters from source".format(len(parameters)))
+        for parameter in parameters:
+            try:
+                self.source.append((parameter, self.writer.comm.read_register(parameter)))
+            except Exception as e:
+                self.parent.log.info("Cloner - Skipping parameter {}, {}".format(parameter, e))
+
+        self.parent.log.info("Cloner - Cached {} parameters from source".format(len(self.source)))
+        return len(self.source) > 0
+
+    def save_backup(self, file_name):
+        """
+        Save the cached source as a .vfd file, it can be
+        compared with vfd_diff or written back later
+        """
+        vfd_diff.save(file_name, self.model, self.source)
+        self.parent.log.info("Cloner - Saved {} parameters to {}".format(len(self.source), file_name))
+
+    def target_plan(self, ip_address=None, node_address=None):
+        """
+        Build the write plan for a target from the cached source,
+        swapping in the target IP address and node address
+        """
+        overrides = {}
+        if ip_address and self.model in parameter_list.IP_ADDRESS:
+            octets = [int(o) for o in ip_address.split(".")]
+            overrides.update(zip(parameter_list.IP_ADDRESS[self.model], octets))
+        if node_address is not None and self.model in parameter_list.NODE_ADDRESS:
+            overrides[parameter_list.NODE_ADDRESS[self.model]] = int(node_address)
+
+        plan = [(p, overrides.pop(p, v)) for p, v in self.source]
+        plan.extend(sorted(overrides.items()))
+        return plan
+
+    def write_target(self, name, ip_address=None, node_address=None):
+        """
+        Write the cached set to the connected drive, returns
+        True on failure like the writer does
+        """
+        self.parent.log.info("Cloner - Writing to {} ip {} node {}".format(name, ip_address, node_address))
+        plan = self.target_plan(ip_address, node_address)
+        self.writer.current_drive = name
+        self.writer.journal.drive(name, journal.STARTED)
+        result = self.writer._write_plan(self.model, plan, batch=True)
+        if result:
+            self.writer.journal.drive(name, journal.FAILED)
+        return result
+
+    def _ip_from_plan(self, model, plan):
+        """
+        Pull the IP address out of a .vfd file's write plan
+        """
+        values = dict(plan)
+        octets = [values.get(p) for p in parameter_list.IP_ADDRESS.get(model, ())]
+        if octets and None not in octets:
+            return ".".join(str(o) for o in octets)
+        return None
+
+    def _node_from_plan(self, model, plan):
+        """
+        Pull the node address out of a .vfd file's write plan
+        """
+        return dict(plan).get(parameter_list.NODE_ADDRESS.get(model))
@@ -0,0 +1,174 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import os
+
+"""
+Queue of drive files waiting to be written.
+
+Files come off the queue by priority, highest first, then by position,
+which starts out alphabetical and can be changed by the operator.  A
+file can name other files that have to be written before it, it isn't
+handed out until they are complete.
+
+Priority and dependencies are set with comment lines in the .vfd file,
+the writer already skips lines starting with #:
+    #priority=10
+    #after=VFD_10_Infeed.vfd
+
+A file that fails goes to the back of the queue so the other drives
+keep moving, after max_failures in one run it's skipped.  Its place is
+given back when the failures are reset for the next run.
+"""
+
+
+def read_directives(file_name):
+    """
+    Get the priority and dependencies from a .vfd file
+    """
+    priority = 0
+    after = set()
+    try:
+        with open(file_name) as f:
+            for line in f:
+                if line.startswith("#priority="):
+                    priority = int(line.split("=", 1)[1])
+                elif line.startswith("#after="):
+                    after.add(line.split("=", 1)[1].strip())
+    except (OSError, ValueError):
+        pass
+    return priority, after
+
+
+class DriveQueue:
+
+    def __init__(self, directory, files=(), max_failures=2):
+        self.directory = directory
+        self.max_failures = max_failures
+
+        self.priority = {}
+        self.after = {}
+        self.position = {}
+        self.failures = {}
+        self.completed = set()
+
+        # (priority, position) of failed files before they were requeued
+        self.requeued = {}
+
+        self._next_position = 0
+        for f in sorted(files):
+            self.add(f)
+
+    def add(self, name):
+        """
+        Queue a file, reading its directives
+        """
+        if name in self.position:
+            return
+        self.priority[name], self.after[name] = read_directives(os.path.join(self.directory, name))
+        self.position[name] = self._next_position
+        self._next_position += 1
+        self.completed.discard(name)
+
+    def remove(self, name):
+        for d in (self.priority, self.after, self.position, self.failures, self.requeued):
+            d.pop(name, None)
+
+    def sync(self, files):
+        """
+        Make the queue match the list of pending files
+        """
+        files = set(files)
+        for name in set(self.position) - files:
+            self.remove(name)
+        for name in sorted(files - set(self.position)):
+            self.add(name)
+
+    def ordered(self):
+        """
+        Every queued file in the order they'll be written
+        """
+        return sorted(self.position, key=lambda n: (-self.priority[n], self.position[n]))
+
+    def ready(self):
+        """
+        Files that can be written now, in order
+        """
+        return [n for n in self.ordered()
+                if self.failures.get(n, 0) < self.max_failures and self.after[n] <= self.completed]
+
+    def blocked(self):
+        """
+        Files still waiting on a dependency
+        """
+        return [n for n in self.ordered() if not self.after[n] <= self.completed]
+
+    def complete(self, name):
+        self.completed.add(name)
+        self.remove(name)
+
+    def requeue(self, name):
+        """
+        Send a failed file to the back of the queue, files
+        that left the queue while being written are skipped
+        """
+        if name not in self.position:
+            return
+        self.requeued.setdefault(name, (self.priority[name], self.position[name]))
+        self.failures[name] = self.failures.get(name, 0) + 1
+        self.priority[name] = min(self.priority.values())
+        self.position[name] = self._next_position
+        self._next_position += 1
+
+    def reset_failures(self):
+        """
+        Forget the failures and put failed files back in their place
+        """
+        self.failures = {}
+        for name, (priority, position) in self.requeued.items():
+            self.priority[name] = priority
+            self.position[name] = position
+        self.requeued = {}
+
+    def move(self, name, step):
+        """
+        Move a file up (negative) or down (positive) one place, it
+        swaps priority and position with the file in that place
+        """
+        order = self.ordered()
+        if name not in order:
+            return
+        i = order.index(name)
+        j = i + step
+        if j < 0 or j >= len(order):
+            return
+        other = order[j]
+        self.requeued.pop(name, None)
+        self.requeued.pop(other, None)
+        self.priority[name], self.priority[other] = self.priority[other], self.priority[name]
+        self.position[name], self.position[other] = self.position[other], self.position[name]
+
+    def first(self, name):
+        """
+        Put a file at the front of the queue
+        """
+        if name not in self.priority:
+            return
+        self.requeued.pop(name, None)
+        self.priority[name] = max(self.priority.values()) + 1
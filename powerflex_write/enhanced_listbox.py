@@ -5,13 +5,17 @@ class EnhancedListbox(tk.Listbox):
 
     def __init__(self, parent, *args, **kwargs):
 
-        super(EnhancedListbox, self).__init__()
+        super(EnhancedListbox, self).__init__(*args, **kwargs)
 
         self.selected_file = ""
         self.parent = parent
 
         self.popup_menu = tk.Menu(self, tearoff=0)
         self.popup_menu.add_command(label="Write", command=self.write_file)
+        self.popup_menu.add_separator()
+        self.popup_menu.add_command(label="Write First", command=self.write_first)
+        self.popup_menu.add_command(label="Move Up", command=lambda: self.move_file(-1))
+        self.popup_menu.add_command(label="Move Down", command=lambda: self.move_file(1))
         self.bind("<Button-3>", self.popup)
         self.bind("<<ListboxSelect>>", self.on_select)
 
@@ -27,11 +31,14 @@ class EnhancedListbox(tk.Listbox):
 
     def popup(self, event):
         """
-        Handles right click context popup
+        Handles right click context popup, a row that isn't
+        selected replaces the selection
         """
-        self.selection_clear(0, tk.END)
-        self.selection_set(self.nearest(event.y))
-        self.activate(self.nearest(event.y))
+        index = self.nearest(event.y)
+        if not self.selection_includes(index):
+            self.selection_clear(0, tk.END)
+            self.selection_set(index)
+        self.activate(index)
         try:
             self.popup_menu.tk_popup(event.x_root, event.y_root, 0)
         finally:
@@ -39,8 +46,48 @@ class EnhancedListbox(tk.Listbox):
 
     def write_file(self):
         """
-        Handles writing single file
+        Handles writing the selected files as one batch
         """
-        for i in self.curselection()[::-1]:
-            data = self.get(i)
-            self.parent.writer.write_single_drive(data)
+        drives = [self.get(i) for i in self.curselection()]
+        if drives:
+            self.parent.write_files(drives)
+
+    def write_first(self):
+        """
+        Put the selected files at the front of the write queue,
+        keeping their order
+        """
+        names = [self.get(i) for i in self.curselection()]
+        for name in reversed(names):
+            self.parent.writer.queue.first(name)
+        self.parent.show_queue()
+        self._select(names)
+
+    def move_file(self, step):
+        """
+        Move the selected files up or down the write queue, the
+        file nearest the way they're moving goes first.  A file
+        stops when the next place holds a file that couldn't move.
+        """
+        queue = self.parent.writer.queue
+        names = [self.get(i) for i in self.curselection()]
+        stuck = set()
+        for name in (reversed(names) if step > 0 else names):
+            order = queue.ordered()
+            j = order.index(name) + step if name in order else -1
+            if j < 0 or j >= len(order) or order[j] in stuck:
+                stuck.add(name)
+                continue
+            queue.move(name, step)
+        self.parent.show_queue()
+        self._select(names)
+
+    def _select(self, names):
+        """
+        Select the named files again after the list is rebuilt
+        """
+        rows = self.get(0, tk.END)
+        for name in names:
+            if name in rows:
+                self.selection_set(rows.index(name))
+                self.see(rows.index(name))
@@ -0,0 +1,85 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+from powerflex_write import rtu
+from powerflex_write import vfd
+
+"""
+Estimate the time to write drive files without a drive connected.
+
+Every write in the plan is grouped the way Writer._send_plan groups it
+and turned into the function 16 request the writer would send and the
+response it expects back, the frame sizes come from rtu.  The time for each transaction
+is the pacing delay, both frames on the wire at the baud rate, the
+3.5 character silent gap after each frame that Modbus RTU requires,
+and the time the drive takes to answer.
+
+Time to plug into each drive isn't included, it's the bus time only.
+
+    python tools.py estimate output/ --baud 19200 --delay 0.05
+"""
+
+# how long the drive takes to answer a request
+TURNAROUND = 0.01
+
+
+def frame_sizes(start, values):
+    """
+    Bytes in the request writing values from start and in its response
+    """
+    request = rtu.write_multiple_request(0, start, values)
+    return len(request), len(rtu.append_crc(request[:6]))
+
+
+def transaction_time(request, response, baudrate, delay, turnaround=TURNAROUND):
+    """
+    Seconds for one request and response
+    """
+    gap = rtu.frame_time(3.5, baudrate)
+    wire = rtu.frame_time(request, baudrate) + rtu.frame_time(response, baudrate) + 2 * gap
+    return delay + wire + turnaround
+
+
+def estimate_plan(plan, baudrate, delay, batch=False, max_block=16, turnaround=TURNAROUND):
+    """
+    Transactions, bytes and seconds to write a plan
+    """
+    if batch:
+        writes = vfd.batch_plan(plan, max_block)
+    else:
+        writes = [(parameter, [value]) for parameter, value in plan]
+    frames = [frame_sizes(start, values) for start, values in writes]
+
+    seconds = sum(transaction_time(req, resp, baudrate, delay, turnaround) for req, resp in frames)
+    return {"parameters": len(plan),
+            "transactions": len(frames),
+            "bytes": sum(req + resp for req, resp in frames),
+            "seconds": seconds}
+
+
+def report(drives, baudrate, delay):
+    """
+    Text report of the estimate for each drive and the total
+    """
+    lines = ["{} baud, {}s delay".format(baudrate, delay)]
+    for d in drives:
+        lines.append("{}: {} writes, {:.1f}s".format(d["drive"][:-4], d["transactions"], d["seconds"]))
+    total = sum(d["seconds"] for d in drives)
+    lines.append("Total: {} drives, {:.1f}s".format(len(drives), total))
+    return "\n".join(lines)
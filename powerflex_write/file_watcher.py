@@ -0,0 +1,190 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+
+"""
+Keep an in-memory index of the .vfd files in the output directory.
+
+Files are tracked as pending (in the output directory), completed (in
+the completed directory) and failed (pending files the writer couldn't
+write this session).  Listeners are called with ("add", name) when a
+file becomes pending and ("remove", name) when it stops being pending,
+so the file list and the writer queue can be updated one file at a
+time instead of rescanning and sorting everything.
+
+On Linux the directories are watched with inotify, poll() just reads
+whatever events are waiting.  Elsewhere, or if inotify isn't available,
+poll() rescans the directories at most once per interval.  Nothing here
+uses threads, the GUI calls poll() from its event loop.
+"""
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+# a new file is only announced once it's closed or moved in, on create
+#   it's still empty and its directives would be read from nothing
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+
+    def __init__(self, parent, directory, interval=1.0):
+        self.parent = parent
+
+        self.directory = os.path.abspath(directory)
+        self.completed_dir = os.path.join(self.directory, "completed")
+        self.interval = interval
+
+        self.pending = set()
+        self.completed = set()
+        self.failed = set()
+        self.listeners = []
+
+        self._fd = None
+        self._watches = {}
+        self._last_scan = 0
+
+        self._start_inotify()
+        self.rescan()
+
+    def subscribe(self, callback):
+        """
+        Call back with (event, name) on every change
+        """
+        self.listeners.append(callback)
+
+    def sorted_pending(self):
+        return sorted(self.pending)
+
+    def mark_failed(self, name):
+        self.failed.add(name)
+
+    def poll(self):
+        """
+        Pick up any changes since the last poll
+        """
+        if self._fd is None:
+            if time.monotonic() - self._last_scan >= self.interval:
+                self.rescan()
+            return
+
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+
+        offset = 0
+        while offset + EVENT.size <= len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b'\0').decode()
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.rescan()
+                return
+            directory = self._watches.get(wd)
+            if directory and name.endswith(".vfd"):
+                self._update(directory, name)
+            elif directory == self.directory and name == "completed":
+                # completed directory was just made, watch it too
+                self._add_watch(self.completed_dir)
+
+    def rescan(self):
+        """
+        Compare the directories with the index and
+        send events for the differences
+        """
+        self._last_scan = time.monotonic()
+        pending = set(self._list(self.directory))
+        completed = set(self._list(self.completed_dir))
+        for name in sorted(pending - self.pending):
+            self._set_pending(name, True)
+        for name in sorted(self.pending - pending):
+            self._set_pending(name, False)
+        self.completed = completed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _update(self, directory, name):
+        exists = os.path.exists(os.path.join(directory, name))
+        if directory == self.directory:
+            self._set_pending(name, exists)
+        elif exists:
+            self.completed.add(name)
+        else:
+            self.completed.discard(name)
+
+    def _set_pending(self, name, pending):
+        if pending == (name in self.pending):
+            return
+        if pending:
+            self.pending.add(name)
+        else:
+            self.pending.discard(name)
+            self.failed.discard(name)
+        for callback in self.listeners:
+            callback("add" if pending else "remove", name)
+
+    def _list(self, directory):
+        try:
+            return [e.name for e in os.scandir(directory) if e.name.endswith(".vfd") and e.is_file()]
+        except OSError:
+            return []
+
+    def _start_inotify(self):
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = self._libc.inotify_init1(os.O_NONBLOCK)
+        except (OSError, AttributeError):
+            fd = -1
+        if fd < 0:
+            self.parent.log.info("Watcher - inotify not available, polling {}".format(self.directory))
+            return
+        self._fd = fd
+        self._add_watch(self.directory)
+        if not self._watches:
+            self.parent.log.info("Watcher - Can't watch {}, polling".format(self.directory))
+            self.close()
+            return
+        self._add_watch(self.completed_dir)
+
+    def _add_watch(self, directory):
+        if not os.path.isdir(directory) or directory in self._watches.values():
+            return
+        wd = self._libc.inotify_add_watch(self._fd, directory.encode(), WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = directory
+            if directory == self.completed_dir:
+                self.completed = set(self._list(directory))
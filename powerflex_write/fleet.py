@@ -0,0 +1,241 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import array
+import os
+
+from collections import Counter
+from powerflex_write import vfd
+from powerflex_write import vfd_diff
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+Load a whole plant's .vfd files and backups as one table for analysis.
+
+Every file is compiled once into a column per parameter, one row per
+drive, next to a presence mask of the same shape that says which files
+set the parameter, any value a drive can hold, -1 included, is a real
+value.  With NumPy installed the table is a single int32 array and a
+bool mask and the checks run on whole columns at a time, without it
+each column is an array.array with a bytearray mask and they fall
+back to plain loops.
+
+    check_ranges    values outside (low, high) limits
+    outliers        drives that disagree with most of their siblings
+                    of the same model, "this drive's decel differs
+                    from its 40 siblings"
+    diff            parameters that changed between two fleets, drives
+                    are matched by file name, e.g. output/ against
+                    the backups
+
+    python tools.py fleet output output/completed backups
+"""
+
+
+def load(directories, model=None):
+    """
+    Read the .vfd files in each directory into a Fleet, files
+    that can't be read are listed in the fleet's errors
+    """
+    drives, models, plans, errors = [], [], [], []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".vfd"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                drive_model, plan = vfd.compile_file(path)
+            except (OSError, ValueError, IndexError) as e:
+                errors.append((path, str(e)))
+                continue
+            if model and drive_model != model:
+                continue
+            drives.append(path)
+            models.append(drive_model)
+            plans.append(plan)
+
+    fleet = build(drives, models, plans)
+    fleet.errors = errors
+    return fleet
+
+
+def build(drives, models, plans):
+    """
+    Make a Fleet from plans, the last value wins when
+    a plan has a parameter twice
+    """
+    parameters = sorted(set(p for plan in plans for p, _ in plan))
+    index = dict((p, i) for i, p in enumerate(parameters))
+    if numpy is not None:
+        values = numpy.zeros((len(parameters), len(drives)), dtype=numpy.int32)
+        present = numpy.zeros((len(parameters), len(drives)), dtype=bool)
+    else:
+        values = [array.array('l', [0]) * len(drives) for _ in parameters]
+        present = [bytearray(len(drives)) for _ in parameters]
+    for d, plan in enumerate(plans):
+        for parameter, value in plan:
+            values[index[parameter]][d] = value
+            present[index[parameter]][d] = True
+    return Fleet(drives, models, parameters, values, present)
+
+
+class Fleet:
+
+    def __init__(self, drives, models, parameters, values, present):
+        self.drives = list(drives)
+        self.models = list(models)
+        self.parameters = list(parameters)
+        self.index = dict((p, i) for i, p in enumerate(self.parameters))
+        # one column per parameter, values[index[parameter]][drive],
+        #   present is true where the drive's file sets it
+        self.values = values
+        self.present = present
+        self.errors = []
+
+    def __len__(self):
+        return len(self.drives)
+
+    def column(self, parameter):
+        """
+        Every drive's value for a parameter and whether
+        the drive sets it, as (values, present)
+        """
+        if parameter not in self.index:
+            return [0] * len(self.drives), [False] * len(self.drives)
+        i = self.index[parameter]
+        return self.values[i], self.present[i]
+
+    def value(self, drive, parameter):
+        values, present = self.column(parameter)
+        d = self.drives.index(drive)
+        return int(values[d]) if present[d] else None
+
+    def select(self, model):
+        """
+        The drives of one model as a new Fleet
+        """
+        rows = [d for d, m in enumerate(self.models) if m == model]
+        if numpy is not None:
+            values = self.values[:, rows]
+            present = self.present[:, rows]
+        else:
+            values = [array.array('l', (column[d] for d in rows)) for column in self.values]
+            present = [bytearray(mask[d] for d in rows) for mask in self.present]
+        return Fleet([self.drives[d] for d in rows], [model] * len(rows), self.parameters, values, present)
+
+    def check_ranges(self, limits):
+        """
+        Values outside {parameter: (low, high)}, as a
+        list of (drive, parameter, value)
+        """
+        found = []
+        for parameter, (low, high) in sorted(limits.items()):
+            if parameter not in self.index:
+                continue
+            column, present = self.column(parameter)
+            if numpy is not None:
+                rows = numpy.nonzero(present & ((column < low) | (column > high)))[0]
+            else:
+                rows = [d for d, v in enumerate(column) if present[d] and not low <= v <= high]
+            found.extend((self.drives[d], parameter, int(column[d])) for d in rows)
+        return found
+
+    def outliers(self, agreement=0.8, minimum=3):
+        """
+        Drives whose value differs from the one most drives of the
+        same model share, when at least agreement of them share it.
+        Returns a list of (drive, parameter, value, usual value,
+        number of drives with the usual value).
+        """
+        if len(set(self.models)) > 1:
+            found = []
+            for model in sorted(set(self.models)):
+                found.extend(self.select(model).outliers(agreement, minimum))
+            return found
+
+        found = []
+        for parameter, column, present in zip(self.parameters, self.values, self.present):
+            if numpy is not None:
+                count = int(present.sum())
+                if count < minimum:
+                    continue
+                values, counts = numpy.unique(column[present], return_counts=True)
+                usual, agree = int(values[counts.argmax()]), int(counts.max())
+                if agree == count or agree < agreement * count:
+                    continue
+                rows = numpy.nonzero(present & (column != usual))[0]
+            else:
+                counts = Counter(v for v, p in zip(column, present) if p)
+                count = sum(counts.values())
+                if count < minimum:
+                    continue
+                usual, agree = counts.most_common(1)[0]
+                if agree == count or agree < agreement * count:
+                    continue
+                rows = [d for d, v in enumerate(column) if present[d] and v != usual]
+            found.extend((self.drives[d], parameter, int(column[d]), usual, agree) for d in rows)
+        return found
+
+    def diff(self, other):
+        """
+        Parameters that changed from this fleet to the other, drives
+        matched by file name.  Returns a list of (drive, parameter,
+        old value, new value) with None for an unset parameter.
+        """
+        theirs = dict((os.path.basename(d), i) for i, d in enumerate(other.drives))
+        pairs = [(d, theirs[os.path.basename(name)]) for d, name in enumerate(self.drives)
+                 if os.path.basename(name) in theirs]
+        ours = [d for d, _ in pairs]
+        others = [o for _, o in pairs]
+
+        found = []
+        for parameter in sorted(set(self.parameters) | set(other.parameters)):
+            old, had = self.column(parameter)
+            new, has = other.column(parameter)
+            if numpy is not None:
+                old, had = numpy.asarray(old)[ours], numpy.asarray(had, dtype=bool)[ours]
+                new, has = numpy.asarray(new)[others], numpy.asarray(has, dtype=bool)[others]
+                rows = numpy.nonzero((had != has) | (had & (old != new)))[0]
+            else:
+                old, had = [old[d] for d in ours], [bool(had[d]) for d in ours]
+                new, has = [new[o] for o in others], [bool(has[o]) for o in others]
+                rows = [i for i in range(len(pairs)) if had[i] != has[i] or (had[i] and old[i] != new[i])]
+            for i in rows:
+                found.append((self.drives[ours[i]], parameter,
+                              int(old[i]) if had[i] else None,
+                              int(new[i]) if has[i] else None))
+        return found
+
+
+def report(fleet, outliers):
+    """
+    Text report of outliers, one per line
+    """
+    models = dict(zip(fleet.drives, fleet.models))
+    lines = []
+    for drive, parameter, value, usual, agree in outliers:
+        lines.append("{} {}:{} is {}, {} other drives have {}".format(
+            drive, parameter, vfd_diff.parameter_name(models[drive], parameter), value, agree, usual))
+    return "\n".join(lines)
@@ -0,0 +1,78 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+from collections import OrderedDict
+from powerflex_write import rtu
+
+"""
+Write frames encoded once and reused for every drive.
+
+Writing the same plan to many drives builds the same request frames
+over and over, only the slave address differs.  FrameCache encodes each
+write once, at slave 0, along with the response it should get back,
+keyed by its start and values.  Drives that only differ in a few values,
+their IP and node address, share every other frame.  For a drive it
+only swaps in the slave address and patches the CRC, rtu.set_slave.  A
+write's normal response is the first six bytes of its request, so a
+response is checked by comparing it with the expected frame, and only a
+mismatch is looked at in detail.
+
+Every write is function 16, write multiple registers, the same request
+minimalmodbus sends for a single register.  Transports are handed the
+writes of a plan before sending them, use(), which grows the cache to
+hold two plans so one drive's frames aren't pushed out by the next.
+Writes are kept in least recently used order.
+"""
+
+
+class FrameCache:
+
+    def __init__(self, size=256):
+        self.size = size
+        self.writes = OrderedDict()
+
+    def use(self, writes):
+        """
+        Make room for the (start, values) writes of a plan
+        and encode any that aren't cached yet
+        """
+        self.size = max(self.size, 2 * len(writes))
+        for start, values in writes:
+            self._frames(start, values)
+
+    def write_multiple(self, slave, start, values):
+        """
+        (request, expected response) for writing values
+        from start, addressed to slave
+        """
+        request, response = self._frames(start, values)
+        return rtu.set_slave(request, slave), rtu.set_slave(response, slave)
+
+    def _frames(self, start, values):
+        key = (start, tuple(values))
+        frames = self.writes.get(key)
+        if frames is not None:
+            self.writes.move_to_end(key)
+            return frames
+        request = rtu.write_multiple_request(0, start, values)
+        frames = request, rtu.append_crc(request[:6])
+        self.writes[key] = frames
+        if len(self.writes) > self.size:
+            self.writes.popitem(last=False)
+        return frames
@@ -0,0 +1,122 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import time
+
+from powerflex_write import identify
+from powerflex_write import parameter_list
+from powerflex_write import serial_tuning
+
+"""
+Watch the com port for a drive being plugged in or unplugged.
+
+Rather than the operator pressing OK once they've plugged in, the
+watcher polls the port with a cheap read of a register every drive
+has (Output Freq), with a timeout sized from the baud rate.  When a
+read succeeds a drive is connected.  It has been unplugged only once
+misses reads in a row fail, a single slow answer doesn't count, or the
+next file would be written into the drive that was just done.
+
+The GUI is kept alive while waiting by calling the parent's update,
+when the parent is a tk widget.  A wait ends early, returning False,
+when the writer is cancelled.
+"""
+
+# register every drive model answers, Output Freq
+PROBE_REGISTER = 1
+
+
+class ConnectionWatcher:
+
+    def __init__(self, writer, interval=0.25, misses=3):
+        self.writer = writer
+        self.parent = writer.parent
+
+        self.interval = interval
+        self.misses = misses
+
+    def probe(self):
+        """
+        True when a drive answers on the port
+        """
+        if self.writer.comm is None and not self.writer._connect():
+            return False
+        comm = self.writer.comm
+        timeout = comm.timeout
+        comm.timeout = min(timeout, serial_tuning.response_timeout(comm.baudrate))
+        try:
+            self.writer.comm.read_register(PROBE_REGISTER)
+            return True
+        except Exception:
+            return False
+        finally:
+            comm.timeout = timeout
+
+    def wait_for_drive(self, timeout=None):
+        """
+        Poll until a drive answers, returns False if the
+        timeout passed or the write was cancelled first
+        """
+        self.parent.log.info("Watcher - Waiting for a drive to be connected")
+        return self._wait(True, timeout)
+
+    def wait_for_disconnect(self, timeout=None):
+        """
+        Poll until the drive stops answering misses times in a row
+        """
+        self.parent.log.info("Watcher - Waiting for the drive to be disconnected")
+        return self._wait(False, timeout)
+
+    def identify(self, model):
+        """
+        Read the drive type and firmware version of the connected
+        drive, returns a tuple or None if they couldn't be read
+        or the drive isn't a model
+        """
+        identity = identify.read_identity(self.writer.comm, [model])
+        if identity is None:
+            other = identify.read_identity(self.writer.comm, [m for m in parameter_list.IDENTITY if m != model])
+            if other:
+                self.parent.log.info("Watcher - Connected to a %s drive, not a %s", other["model"], model)
+            else:
+                self.parent.log.info("Watcher - Failed to identify drive")
+            return None
+        self.parent.log.info("Watcher - Connected to %s drive type %s firmware %s",
+                             model, identity["drive_type"], identity["firmware"])
+        return identity["drive_type"], identity["firmware"]
+
+    def _wait(self, connected, timeout):
+        start = time.monotonic()
+        failed = 0
+        while not self.writer.cancelled:
+            if self.probe():
+                failed = 0
+                if connected:
+                    return True
+            else:
+                failed += 1
+                if not connected and failed >= self.misses:
+                    return True
+            if timeout is not None and time.monotonic() - start > timeout:
+                return False
+            update = getattr(self.parent, "update", None)
+            if update:
+                update()
+            time.sleep(self.interval)
+        return False
@@ -0,0 +1,123 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import os
+
+from powerflex_write import parameter_list
+from powerflex_write import vfd
+
+"""
+Match a connected drive to its pending .vfd file, so drives can be
+plugged into in any order.
+
+read_identity reads the drive type and firmware, then the current IP
+address and node address settings of the connected drive.  The model
+is found by trying the identity parameters of each model that has a
+pending file, it's only taken when the drive type is one listed for
+the model in parameter_list.DRIVE_TYPES.
+
+DriveIndex is built over the pending files in the output directory,
+keyed by model, IP address and node address taken from each file.  A
+drive is matched to a file for its model when only one file sets:
+    1. the IP address the drive already has
+    2. the node address the drive already has
+Otherwise, like drives still at factory settings, there's no telling
+which file is meant for the drive, and the writer asks the operator.
+"""
+
+
+def read_identity(comm, models):
+    """
+    Read the identity of the connected drive, trying each of the
+    models.  Returns a dictionary, or None if no model answered.
+    """
+    for model in models:
+        if model not in parameter_list.IDENTITY:
+            continue
+        try:
+            drive_type, firmware = [comm.read_register(p) for p in parameter_list.IDENTITY[model]]
+        except Exception:
+            continue
+        if drive_type not in parameter_list.DRIVE_TYPES.get(model, ()):
+            continue
+
+        identity = {"model": model, "drive_type": drive_type, "firmware": firmware, "ip": None, "node": None}
+        try:
+            if model in parameter_list.IP_ADDRESS:
+                identity["ip"] = tuple(comm.read_register(p) for p in parameter_list.IP_ADDRESS[model])
+            identity["node"] = comm.read_register(parameter_list.NODE_ADDRESS[model])
+        except Exception:
+            pass
+        return identity
+    return None
+
+
+class DriveIndex:
+
+    def __init__(self, directory, files=()):
+        self.directory = directory
+        self.entries = {}
+        for f in files:
+            self.add(f)
+
+    def add(self, file_name):
+        """
+        Index a .vfd file by what it will set on the drive
+        """
+        model, plan = vfd.compile_file(os.path.join(self.directory, file_name))
+        values = dict(plan)
+        ip = tuple(values.get(p) for p in parameter_list.IP_ADDRESS.get(model, ()))
+        self.entries[file_name] = {"model": model,
+                                   "ip": ip if ip and None not in ip else None,
+                                   "node": values.get(parameter_list.NODE_ADDRESS.get(model))}
+
+    def remove(self, file_name):
+        self.entries.pop(file_name, None)
+
+    def models(self):
+        return sorted(set(e["model"] for e in self.entries.values()))
+
+    def candidates(self, identity, names=None):
+        """
+        Pending files for the model of the identified drive.  names
+        limits the files to choose from, and keeps their order.
+        """
+        if not identity:
+            return []
+        if names is None:
+            names = sorted(self.entries)
+        return [f for f in names if f in self.entries and self.entries[f]["model"] == identity["model"]]
+
+    def match(self, identity, names=None):
+        """
+        Find the pending file for the identified drive, returns the
+        file name or None when no single file matches its IP or
+        node address
+        """
+        candidates = self.candidates(identity, names)
+        for key in ("ip", "node"):
+            if not candidates or identity[key] is None:
+                continue
+            found = [f for f in candidates if self.entries[f][key] == identity[key]]
+            if len(found) == 1:
+                return found[0]
+        return None
+
+    def __len__(self):
+        return len(self.entries)
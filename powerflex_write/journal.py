@@ -0,0 +1,143 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import json
+import os
+import time
+
+"""
+Append-only journal of every write, one JSON object per line.
+
+Each run gets an id (its start time).  Drive records mark when a drive
+was started, completed, failed or moved to the completed directory,
+parameter records hold the parameter, value, result and latency of
+every attempt, retries included.  Lines are flushed as they're written
+and the file is synced when a drive finishes, so a crash loses at most
+the drive in progress.
+
+The journal is the record of what happened: the writer reads it on
+start to finish moving any drive that completed but didn't get moved,
+and report() summarizes the throughput of each run.
+
+    python tools.py journal output/journal.jsonl
+"""
+
+STARTED = "started"
+COMPLETED = "completed"
+FAILED = "failed"
+MOVED = "moved"
+
+
+class Journal:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.run = None
+        self._file = None
+
+    def open(self):
+        """
+        Start a new run, appending to the journal.  Returns False
+        if the journal can't be opened, writing carries on without it.
+        """
+        self.run = "{:.6f}".format(time.time())
+        try:
+            self._file = open(self.file_name, "a")
+        except OSError:
+            self._file = None
+        return self._file is not None
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def drive(self, drive, state, digest=None):
+        """
+        Record a drive changing state, every state but started
+        is synced to disk before returning.  digest is the
+        hash of the file that was written.
+        """
+        self._append({"drive": drive, "state": state, "digest": digest})
+        if state != STARTED and self._file:
+            os.fsync(self._file.fileno())
+
+    def parameter(self, drive, parameter, value, result, latency):
+        self._append({"drive": drive, "parameter": parameter, "value": value,
+                      "result": result, "latency": round(latency, 6)})
+
+    def states(self):
+        """
+        Last recorded (state, digest) of each drive
+        """
+        states = {}
+        for record in read(self.file_name):
+            if "state" in record:
+                states[record["drive"]] = (record["state"], record.get("digest"))
+        return states
+
+    def _append(self, record):
+        if self._file is None and not self.open():
+            return
+        record["time"] = time.time()
+        record["run"] = self.run
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+
+def read(file_name):
+    """
+    Yield each record in a journal, skipping a partial
+    last line left by a crash
+    """
+    if not os.path.exists(file_name):
+        return
+    with open(file_name) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def report(file_name):
+    """
+    Throughput of each run in the journal
+    """
+    runs = {}
+    for record in read(file_name):
+        run = runs.setdefault(record["run"], {"run": record["run"], "start": record["time"], "end": record["time"],
+                                              "completed": 0, "failed": 0, "writes": 0, "errors": 0, "wire": 0.0})
+        run["end"] = record["time"]
+        if record.get("state") == COMPLETED:
+            run["completed"] += 1
+        elif record.get("state") == FAILED:
+            run["failed"] += 1
+        elif "parameter" in record:
+            run["writes"] += 1
+            run["wire"] += record["latency"]
+            if record["result"] != "ok":
+                run["errors"] += 1
+
+    for run in runs.values():
+        seconds = run["end"] - run["start"]
+        run["seconds"] = seconds
+        run["drives_per_hour"] = 3600.0 * run["completed"] / seconds if seconds else 0.0
+        run["params_per_second"] = run["writes"] / seconds if seconds else 0.0
+    return sorted(runs.values(), key=lambda r: r["start"])
@@ -0,0 +1,205 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import os
+import tkinter as tk
+
+from collections import deque
+from collections import namedtuple
+
+"""
+A log window that follows the run log as it grows.
+
+LogTail only reads the bytes added since the last read, so following a
+multi-hour log costs the same as following a new one.  Opening a big
+log starts near the end rather than reading the whole file, and only
+the newest max_lines are kept.  When the log rotates, the rest of the
+rotated file is read before starting on the new one.
+
+Each line is tagged with its level and the drive being written, taken
+from the last "Writer - Writing to" line, so the window can filter by
+drive and severity.
+"""
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+# bytes of an existing log to start with for each line kept
+LINE_BYTES = 200
+
+Entry = namedtuple("Entry", "drive level text")
+
+
+class LogTail:
+
+    def __init__(self, file_name, max_lines=5000):
+        self.file_name = file_name
+        self.lines = deque(maxlen=max_lines)
+
+        self.offset = None
+        self.inode = None
+        self.partial = b''
+        self.drive = None
+        self.level = "INFO"
+
+    def read(self):
+        """
+        Read the lines added since the last read, returns
+        them as new entries
+        """
+        try:
+            stat = os.stat(self.file_name)
+        except OSError:
+            return []
+
+        data = b''
+        skip = False
+        if self.offset is None:
+            self.offset = max(0, stat.st_size - self.lines.maxlen * LINE_BYTES)
+            # started part way through a line
+            skip = self.offset > 0
+        elif stat.st_ino != self.inode or stat.st_size < self.offset:
+            data = self._read_from(self.file_name + ".1", self.offset)
+            self.offset = 0
+        self.inode = stat.st_ino
+
+        added = self._read_from(self.file_name, self.offset)
+        self.offset += len(added)
+        lines = (self.partial + data + added).split(b'\n')
+        self.partial = lines.pop()
+        if skip and lines:
+            lines.pop(0)
+
+        entries = [self._parse(line.decode('utf-8', 'replace').rstrip('\r')) for line in lines if line]
+        self.lines.extend(entries)
+        return entries
+
+    def matching(self, drive="", level="DEBUG"):
+        """
+        Kept entries for a drive at or above a level
+        """
+        return [e for e in self.lines if matches(e, drive, level)]
+
+    def _read_from(self, file_name, offset):
+        try:
+            with open(file_name, 'rb') as f:
+                f.seek(offset)
+                return f.read()
+        except OSError:
+            return b''
+
+    def _parse(self, line):
+        """
+        Tag a line with its level and drive, lines without a level,
+        like tracebacks, keep the one before them
+        """
+        fields = line.split(" - ", 2)
+        if len(fields) == 3 and fields[1] in LEVELS:
+            self.level = fields[1]
+            if fields[2].startswith("Writer - Writing to "):
+                self.drive = fields[2][len("Writer - Writing to "):]
+        return Entry(self.drive, self.level, line)
+
+
+def matches(entry, drive="", level="DEBUG"):
+    """
+    True when the entry is at or above the level and is for
+    the drive, drive is matched on part of the name
+    """
+    if LEVELS.index(entry.level) < LEVELS.index(level):
+        return False
+    return not drive or drive.lower() in (entry.drive or "").lower()
+
+
+class LogViewer(tk.Toplevel):
+
+    def __init__(self, parent, file_name, interval=500, max_lines=5000):
+        tk.Toplevel.__init__(self, parent.main)
+        self.parent = parent
+        self.title("Log - {}".format(os.path.basename(file_name)))
+        self.geometry("800x400")
+
+        self.tail = LogTail(file_name, max_lines)
+        self.interval = interval
+        self.max_lines = max_lines
+        self.after_id = None
+
+        self.drive_val = tk.StringVar()
+        self.level_val = tk.StringVar()
+        self.level_val.set("DEBUG")
+        self.follow_val = tk.BooleanVar()
+        self.follow_val.set(True)
+
+        self.frame = tk.Frame(self)
+        self.drive_lbl = tk.Label(self.frame, text="Drive:")
+        self.drive = tk.Entry(self.frame, textvariable=self.drive_val)
+        self.level_lbl = tk.Label(self.frame, text="Level:")
+        self.level = tk.OptionMenu(self.frame, self.level_val, *LEVELS)
+        self.follow = tk.Checkbutton(self.frame, text="Follow", variable=self.follow_val)
+
+        self.text = tk.Text(self, wrap="none", state="disabled")
+        self.scroll = tk.Scrollbar(self, command=self.text.yview)
+        self.text.config(yscrollcommand=self.scroll.set)
+
+        self.frame.pack(fill=tk.X, padx=5, pady=5)
+        self.drive_lbl.pack(side=tk.LEFT)
+        self.drive.pack(side=tk.LEFT, padx=5)
+        self.level_lbl.pack(side=tk.LEFT)
+        self.level.pack(side=tk.LEFT, padx=5)
+        self.follow.pack(side=tk.LEFT, padx=5)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(fill=tk.BOTH, expand=True)
+
+        self.drive_val.trace_add("write", self.refresh)
+        self.level_val.trace_add("write", self.refresh)
+        self.poll()
+
+    def poll(self):
+        """
+        Show new lines, then check again shortly
+        """
+        drive, level = self.drive_val.get(), self.level_val.get()
+        self._append([e for e in self.tail.read() if matches(e, drive, level)])
+        self.after_id = self.after(self.interval, self.poll)
+
+    def refresh(self, *args):
+        """
+        Redraw the kept lines with the new filter
+        """
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.config(state="disabled")
+        self._append(self.tail.matching(self.drive_val.get(), self.level_val.get()))
+
+    def _append(self, entries):
+        if not entries:
+            return
+        self.text.config(state="normal")
+        self.text.insert(tk.END, "".join(e.text + "\n" for e in entries))
+        lines = int(self.text.index("end-1c").split(".")[0]) - 1
+        if lines > self.max_lines:
+            self.text.delete("1.0", "{}.0".format(lines - self.max_lines + 1))
+        self.text.config(state="disabled")
+        if self.follow_val.get():
+            self.text.see(tk.END)
+
+    def destroy(self):
+        if self.after_id:
+            self.after_cancel(self.after_id)
+            self.after_id = None
+        tk.Toplevel.destroy(self)
@@ -0,0 +1,134 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import csv
+import json
+import time
+
+from contextlib import contextmanager
+
+"""
+Timing and counters for a write run.
+
+The writer records every write's latency, timeouts, retries and where
+the time went for each drive: sleep (pacing delay), wire (waiting on
+the drive) and prompt (waiting on the operator).  Latencies go into a
+fixed bucket histogram, per drive totals are kept separately.  At the
+end of a run the whole thing can be exported as JSON or the per drive
+totals as CSV.
+"""
+
+# upper edge of each latency bucket in seconds, anything
+#   slower lands in the last (overflow) bucket
+BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+FIELDS = ("drive", "writes", "failures", "timeouts", "retries", "wire", "sleep", "prompt")
+
+
+class Metrics:
+
+    def __init__(self):
+        self.histogram = [0] * (len(BUCKETS) + 1)
+        self.latencies = []
+        self.drives = {}
+        self.current = None
+        self.started = time.time()
+
+    def start_drive(self, name):
+        """
+        Following records are counted against this drive
+        """
+        self.current = self.drives.setdefault(name, dict((f, 0) for f in FIELDS[1:]))
+
+    def record_write(self, latency, ok=True, timeout=False, name=None):
+        """
+        Record one write to the drive, name overrides the
+        current drive for callers writing several at once
+        """
+        self.latencies.append(latency)
+        for i, edge in enumerate(BUCKETS):
+            if latency <= edge:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+        drive = self._drive(name)
+        drive["writes"] += 1
+        drive["wire"] += latency
+        if not ok:
+            drive["failures"] += 1
+        if timeout:
+            drive["timeouts"] += 1
+
+    def record_retry(self):
+        self._drive()["retries"] += 1
+
+    def add_time(self, kind, seconds, name=None):
+        """
+        Add time to sleep, wire or prompt for the current drive
+        """
+        self._drive(name)[kind] += seconds
+
+    @contextmanager
+    def timer(self, kind):
+        """
+        Time the block as sleep, wire or prompt
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(kind, time.perf_counter() - start)
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+    def summary(self):
+        """
+        Everything recorded as a dictionary
+        """
+        totals = dict((f, sum(d[f] for d in self.drives.values())) for f in FIELDS[1:])
+        return {"started": self.started,
+                "drives": self.drives,
+                "totals": totals,
+                "histogram": dict(zip([str(b) for b in BUCKETS] + ["inf"], self.histogram)),
+                "p50_latency": self.percentile(50),
+                "p99_latency": self.percentile(99)}
+
+    def export_json(self, file_name):
+        with open(file_name, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_csv(self, file_name):
+        with open(file_name, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for name in sorted(self.drives):
+                writer.writerow([name] + [self.drives[name][k] for k in FIELDS[1:]])
+
+    def _drive(self, name=None):
+        if name is not None:
+            return self.drives.setdefault(name, dict((f, 0) for f in FIELDS[1:]))
+        if self.current is None:
+            self.start_drive("")
+        return self.current
@@ -0,0 +1,158 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import hashlib
+import os
+
+from collections import defaultdict
+from powerflex_write import vfd
+from powerflex_write import vfd_diff
+
+"""
+Keep the parameters drives share once, as content addressed base sets.
+
+Generated files are mostly the same lines over and over.  A store splits
+a group of plans for one model into a base, the parameters every plan
+sets to the same value, and a small set of overrides for each drive.
+The base is saved as bases/<sha1>.vfd, the name is the hash of its
+contents so the same base is only ever saved once and can't change
+under the files pointing at it.  Each drive file is just:
+    *PF525
+    #base=<sha1>
+    132:En IP Addr Cfg 4:21
+
+vfd.compile_file puts the two back together, compiling each base once
+for every drive that uses it.  pack converts a directory of full files,
+prune removes bases no file points at any more.
+
+    python tools.py pack output/
+"""
+
+
+def digest(model, plan):
+    """
+    Name of a base set, the hash of its contents
+    """
+    text = "*{}\n".format(model) + "".join("{}:{}\n".format(p, v) for p, v in plan)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def split(plans):
+    """
+    Split plans into the base plan they share, in the first plan's
+    order, and the overrides of each plan
+    """
+    values = [dict(plan) for plan in plans]
+    base = []
+    for parameter in dict(plans[0]) if plans else ():
+        if all(parameter in v and v[parameter] == values[0][parameter] for v in values):
+            base.append((parameter, values[0][parameter]))
+
+    names = set(p for p, _ in base)
+    return base, [[(p, v) for p, v in plan if p not in names] for plan in plans]
+
+
+class ParameterStore:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.base_dir = os.path.join(directory, vfd.BASE_DIR)
+
+    def add_base(self, model, plan):
+        """
+        Save a base set if it isn't already stored, returns its name
+        """
+        name = digest(model, plan)
+        path = os.path.join(self.base_dir, name + ".vfd")
+        if not os.path.exists(path):
+            if not os.path.exists(self.base_dir):
+                os.makedirs(self.base_dir)
+            vfd_diff.save(path + ".tmp", model, plan)
+            os.replace(path + ".tmp", path)
+        return name
+
+    def save_drive(self, file_name, model, base, overrides, directives=()):
+        """
+        Save a drive file as a reference to a base and its overrides
+        """
+        with open(file_name, "w") as f:
+            f.write("*{}\n".format(model))
+            f.write("#base={}\n".format(base))
+            for line in directives:
+                f.write(line)
+            for parameter, value in overrides:
+                f.write("{}:{}:{}\n".format(parameter, vfd_diff.parameter_name(model, parameter), value))
+
+    def save_drives(self, model, drives):
+        """
+        Save (file name, plan, directive lines) drives of one model,
+        the shared parameters go in a base, returns the base name
+        """
+        base, overrides = split([plan for _, plan, _ in drives])
+        name = self.add_base(model, base)
+        for (file_name, _, directives), plan in zip(drives, overrides):
+            self.save_drive(file_name + ".tmp", model, name, plan, directives)
+            os.replace(file_name + ".tmp", file_name)
+        return name
+
+    def pack(self, files=None):
+        """
+        Rewrite full .vfd files in the directory as a base and
+        overrides, one base per model.  Directive lines are kept.
+        Returns the number of files rewritten.
+        """
+        if files is None:
+            files = sorted(f for f in os.listdir(self.directory) if f.endswith(".vfd"))
+
+        models = defaultdict(list)
+        for drive in files:
+            path = os.path.join(self.directory, drive)
+            with open(path) as f:
+                directives = [line for line in f if line.startswith("#")]
+            if any(line.startswith("#base=") for line in directives):
+                continue
+            model, plan = vfd.compile_file(path)
+            models[model].append((path, plan, directives))
+
+        for model, drives in models.items():
+            self.save_drives(model, drives)
+        return sum(len(d) for d in models.values())
+
+    def prune(self):
+        """
+        Remove bases that no file in the directory or its completed
+        directory points at, returns the names removed
+        """
+        if not os.path.exists(self.base_dir):
+            return []
+        used = set()
+        for d in (self.directory, os.path.join(self.directory, "completed")):
+            if not os.path.exists(d):
+                continue
+            for drive in os.listdir(d):
+                if drive.endswith(".vfd"):
+                    with open(os.path.join(d, drive)) as f:
+                        used.update(line.split("=", 1)[1].strip() for line in f if line.startswith("#base="))
+
+        removed = []
+        for base in os.listdir(self.base_dir):
+            if base.endswith(".vfd") and base[:-4] not in used:
+                os.remove(os.path.join(self.base_dir, base))
+                removed.append(base[:-4])
+        return removed
@@ -21,6 +21,93 @@ def get_parameter_name(drive, parameter):
         return "Unknown Drive Type: " + drive
 
 
+def get_parameters(drive):
+    """
+    Return the full parameter dictionary for a drive model,
+        or an empty dictionary when the model is unknown
+    """
+    return MODELS.get(drive, {})
+
+
+def get_program_parameters(drive):
+    """
+    Return the sorted list of programmable parameters for
+        a drive model.  Display parameters and reserved slots
+        are skipped, these are what we copy when cloning a drive.
+    """
+    parameters = get_parameters(drive)
+    return [p for p in sorted(parameters)
+            if any(first <= p <= last for first, last in PROGRAM_RANGES.get(drive, ()))
+            and parameters[p] != "Reserved"]
+
+
+# ranges of programmable (read/write) parameters, the rest
+#   are display and fault history.  The PF40P advanced display
+#   group (d301-d316) and the PF52x one (d360-d399) sit between
+#   program groups, so they're left out.
+PROGRAM_RANGES = {"PF4": ((31, 118),),
+                  "PF40": ((31, 167),),
+                  "PF40P": ((31, 300),),
+                  "PF523": ((30, 359), (400, 600)),
+                  "PF525": ((30, 359), (400, 600))}
+
+# parameter holding the RS485 node address
+NODE_ADDRESS = {"PF4": 104,
+                "PF40": 104,
+                "PF40P": 104,
+                "PF523": 124,
+                "PF525": 124}
+
+# parameters holding the 4 IP address octets,
+#   only the models with embedded ethernet
+IP_ADDRESS = {"PF525": (129, 130, 131, 132)}
+
+# reset to defaults, wipes anything written before it
+DEFAULTS = {"PF4": 41,
+            "PF40": 41,
+            "PF40P": 41,
+            "PF523": 53,
+            "PF525": 53}
+
+# parameters that change how the drive talks on the RS485
+#   port we write through, these have to be written last
+COMM = {"PF4": (103, 104, 107),
+        "PF40": (103, 104, 107),
+        "PF40P": (103, 104, 107),
+        "PF523": (123, 124, 127, 175),
+        "PF525": (123, 124, 127, 175)}
+
+# parameters that only take effect after the drive is reset
+RESET = {"PF4": (103, 104, 107),
+         "PF40": (103, 104, 107),
+         "PF40P": (103, 104, 107),
+         "PF523": (123, 124, 127, 175),
+         "PF525": (123, 124, 127, 128, 129, 130, 131, 132, 133, 134, 135, 136,
+                   137, 138, 139, 140, 141, 175)}
+
+# comm data rate parameter value to baud rate
+BAUD_RATE = {"PF4": {0: 2400, 1: 4800, 2: 9600, 3: 19200, 4: 38400},
+             "PF40": {0: 2400, 1: 4800, 2: 9600, 3: 19200, 4: 38400},
+             "PF40P": {0: 2400, 1: 4800, 2: 9600, 3: 19200, 4: 38400},
+             "PF523": {0: 1200, 1: 2400, 2: 4800, 3: 9600, 4: 19200, 5: 38400},
+             "PF525": {0: 1200, 1: 2400, 2: 4800, 3: 9600, 4: 19200, 5: 38400}}
+
+# parameters identifying the drive, drive type and firmware
+IDENTITY = {"PF4": (17, 16),
+            "PF40": (17, 16),
+            "PF40P": (17, 16),
+            "PF523": (367, 29),
+            "PF525": (367, 29)}
+
+# drive type values reported for each model, a drive reporting
+#   a value that isn't listed isn't taken for that model
+DRIVE_TYPES = {"PF4": (4,),
+               "PF40": (40,),
+               "PF40P": (41,),
+               "PF523": (523,),
+               "PF525": (525,)}
+
+
 PF4 = {1: "Output Freq",
        2: "Commanded Freq",
        3: "Output Current",
@@ -1361,3 +1448,9 @@ PF525 = {1: "Output Freq",
          729: "EN Tx Errors",
          730: "EN Missed IO Pkt",
          731: "DSI Errors"}
+
+MODELS = {"PF4": PF4,
+          "PF40": PF40,
+          "PF40P": PF40P,
+          "PF523": PF523,
+          "PF525": PF525}
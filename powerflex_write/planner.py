@@ -0,0 +1,101 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+from powerflex_write import parameter_list
+
+"""
+Put a write plan in a safe order for the drive.
+
+Some parameters change the RS485 settings of the port we're writing
+through (data rate, node address, format).  If one of those is written
+in the middle of a file, every write after it goes out at the old
+settings and times out.  Reset to defaults has the opposite problem,
+written late it wipes everything before it.
+
+The plan is reordered as:
+    1. reset to defaults
+    2. everything else, in file order
+    3. parameters that only apply after a reset
+    4. parameters that change the comm settings
+parameter_list has which parameters fall in each group for each model.
+
+When several drives of the same model share a bus, shared splits their
+plans into the parameters every drive gets the same value for, which
+can be sent once as a broadcast, and what is left for each drive.
+Only group 2 parameters are shared, a broadcast reset or comm change
+would leave every drive on the bus at the same address.
+"""
+
+
+def order(model, plan):
+    """
+    Returns the reordered plan, and True when the
+    drive needs a reset for the plan to take effect
+    """
+    defaults = parameter_list.DEFAULTS.get(model)
+    comm = parameter_list.COMM.get(model, ())
+    reset = parameter_list.RESET.get(model, ())
+
+    first, middle, after_reset, last = [], [], [], []
+    for parameter, value in plan:
+        if parameter == defaults:
+            first.append((parameter, value))
+        elif parameter in comm:
+            last.append((parameter, value))
+        elif parameter in reset:
+            after_reset.append((parameter, value))
+        else:
+            middle.append((parameter, value))
+    return first + middle + after_reset + last, bool(after_reset or last)
+
+
+def shared(model, plans):
+    """
+    Returns the plan of parameters common to all the plans,
+    and the plans with those parameters taken out
+    """
+    excluded = set(parameter_list.COMM.get(model, ())) | set(parameter_list.RESET.get(model, ()))
+    excluded.add(parameter_list.DEFAULTS.get(model))
+
+    # the last value wins when a file has a parameter twice
+    values = [dict(plan) for plan in plans]
+    common = []
+    for parameter in dict(plans[0]) if plans else ():
+        if parameter in excluded:
+            continue
+        if all(parameter in v and v[parameter] == values[0][parameter] for v in values):
+            common.append((parameter, values[0][parameter]))
+
+    names = set(p for p, _ in common)
+    return common, [[(p, v) for p, v in plan if p not in names] for plan in plans]
+
+
+def comm_settings(model, plan, baudrate, address):
+    """
+    The baud rate and node address the drive will use once
+    the plan is applied and it has been reset
+    """
+    values = dict(plan)
+    rate = parameter_list.COMM.get(model, (None,))[0]
+    if rate in values:
+        baudrate = parameter_list.BAUD_RATE[model].get(values[rate], baudrate)
+    node = parameter_list.NODE_ADDRESS.get(model)
+    if node in values:
+        address = values[node]
+    return baudrate, address
@@ -0,0 +1,193 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import json
+import serial.tools.list_ports
+import threading
+
+from collections import namedtuple
+
+"""
+Find com ports in the background and remember the adapter in use.
+
+Listing ports can take seconds on a PC with lots of virtual ports, so a
+PortScanner thread lists them and the gui picks up the cached results
+without waiting.  USB adapters are fingerprinted by VID, PID and serial
+number.  The fingerprint of the last adapter the writer connected with
+is saved, next time it's picked again even if it comes back as another
+com port, and the writer follows it to its new port when it's unplugged
+and plugged back in during a run.
+"""
+
+Port = namedtuple("Port", "device description fingerprint")
+
+
+def fingerprint(info):
+    """
+    VID:PID:serial of a USB adapter, None for other ports
+    """
+    if info.vid is None:
+        return None
+    return "{:04X}:{:04X}:{}".format(info.vid, info.pid or 0, info.serial_number or "")
+
+
+class PortScanner:
+
+    def __init__(self, parent, settings_file, interval=5.0):
+        self.parent = parent
+        self.settings_file = settings_file
+        self.interval = interval
+
+        self.ports = []
+        # fingerprint of every device seen, so an adapter can
+        #   be found again after it moves
+        self.seen = {}
+        self.preferred = None
+        self.last_port = None
+        self.changed = False
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.settings_file) as f:
+                settings = json.load(f)
+            self.preferred = settings.get("fingerprint")
+            self.last_port = settings.get("port")
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        try:
+            with open(self.settings_file, "w") as f:
+                json.dump({"fingerprint": self.preferred, "port": self.last_port}, f)
+        except OSError as e:
+            self.parent.log.info("Ports - Failed to save {}, {}".format(self.settings_file, e))
+
+    def start(self):
+        """
+        Scan now and every interval after, in the background
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def refresh(self):
+        """
+        Have the background thread scan now
+        """
+        self._wake.set()
+
+    def scan(self):
+        """
+        List the ports, returns them
+        """
+        ports = []
+        for info in sorted(serial.tools.list_ports.comports(), key=lambda p: p.device):
+            ports.append(Port(info.device, info.description, fingerprint(info)))
+        with self._lock:
+            if ports != self.ports:
+                self.ports = ports
+                self.changed = True
+                for port in ports:
+                    if port.fingerprint:
+                        self.seen[port.device] = port.fingerprint
+        return ports
+
+    def updated(self):
+        """
+        The ports when they changed since the last call, else None
+        """
+        with self._lock:
+            if not self.changed:
+                return None
+            self.changed = False
+            return list(self.ports)
+
+    def choose(self):
+        """
+        Port to select, the remembered adapter wherever it is now,
+        then the last port used, then the first USB adapter
+        """
+        with self._lock:
+            ports = list(self.ports)
+        for port in ports:
+            if self.preferred and port.fingerprint == self.preferred:
+                return port.device
+        devices = [p.device for p in ports]
+        if self.last_port in devices:
+            return self.last_port
+        for port in ports:
+            if port.fingerprint:
+                return port.device
+        return devices[-1] if devices else ""
+
+    def resolve(self, device):
+        """
+        The port an adapter is on now, when it has moved since
+        it was device.  Other ports are returned as they are.
+        The ports are only listed again when device is missing
+        from the last scan.
+        """
+        known = self.seen.get(device)
+        if not known:
+            return device
+        with self._lock:
+            ports = list(self.ports)
+        if device in [p.device for p in ports]:
+            return device
+        ports = self.scan()
+        if device in [p.device for p in ports]:
+            return device
+        for port in ports:
+            if port.fingerprint == known:
+                self.parent.log.info("Ports - Adapter {} moved from {} to {}".format(known, device, port.device))
+                return port.device
+        return device
+
+    def remember(self, device):
+        """
+        Save the adapter on device as the one to use next time
+        """
+        known = self.seen.get(device)
+        if (known, device) != (self.preferred, self.last_port):
+            self.preferred = known
+            self.last_port = device
+            self.save()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                self.parent.log.info("Ports - Failed to list com ports, {}".format(e))
+            self._wake.wait(self.interval)
+            self._wake.clear()
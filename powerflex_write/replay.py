@@ -0,0 +1,70 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import time
+
+from collections import defaultdict
+from collections import deque
+from powerflex_write import capture
+from powerflex_write import rtu
+from powerflex_write.simulator import Simulator
+
+"""
+Play a capture back as a fake drive, to reproduce a field problem
+offline or try pacing and retry changes against real timing.
+
+ReplaySlave answers each request with the response that was captured
+for the same request, after the same delay, in the order they were
+captured.  Requests that were never captured get no answer.  It's a
+Simulator, so it's served on a pty the same way (Linux only), or in
+process with a replay:// port:
+    python tools.py replay output/capture_20240521_101500.pfwcap
+    python tools.py replay output/capture_20240521_101500.pfwcap --dump
+"""
+
+
+class ReplaySlave(Simulator):
+
+    def __init__(self, file_name, model="PF525", log=None):
+        started, baudrate, frames = capture.read(file_name)
+        super(ReplaySlave, self).__init__(model, baudrate=baudrate, log=log)
+        self.file_name = file_name
+
+        # captured answers for each request, in order
+        self.answers = defaultdict(deque)
+        for request, response, delay in capture.exchanges(frames):
+            self.answers[request].append((response, delay))
+
+    def handle(self, request):
+        """
+        The next captured response to the request, after the
+        captured delay less the time on the wire
+        """
+        self.requests += 1
+        answers = self.answers.get(request)
+        if not answers:
+            self.errors += 1
+            self.log.info("Replay - No captured answer for {}".format(request.hex(" ")))
+            return None
+
+        # the last answer is kept for any repeats past the end of the capture
+        response, delay = answers.popleft() if len(answers) > 1 else answers[0]
+        wire = rtu.frame_time(len(request) + len(response or b''), self.baudrate)
+        time.sleep(max(0.0, delay - wire))
+        return response
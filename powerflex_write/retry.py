@@ -0,0 +1,93 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import minimalmodbus
+import serial
+
+"""
+Retry policy for failed writes.
+
+Errors from minimalmodbus are sorted into a few classes, each with its
+own retry budget.  Line noise (CRC errors) and the odd missed answer
+(timeouts) get a few quick retries with exponential backoff.  An
+illegal data address won't get better by asking again, so it has no
+budget.  A port that went away (adapter unplugged) gets a retry after
+the writer reopens it.
+
+The budget is for a single parameter, reset before each one.  When it
+runs out, next_delay returns None and the writer asks the operator.
+"""
+
+TIMEOUT = "timeout"
+CRC = "crc"
+ILLEGAL_ADDRESS = "illegal_address"
+PORT_GONE = "port_gone"
+OTHER = "other"
+
+BUDGETS = {TIMEOUT: 3,
+           CRC: 5,
+           ILLEGAL_ADDRESS: 0,
+           PORT_GONE: 2,
+           OTHER: 1}
+
+
+def classify(error):
+    """
+    Sort an exception into one of the retry classes
+    """
+    if isinstance(error, minimalmodbus.NoResponseError):
+        return TIMEOUT
+    elif isinstance(error, minimalmodbus.InvalidResponseError):
+        return CRC
+    elif isinstance(error, minimalmodbus.IllegalRequestError):
+        return ILLEGAL_ADDRESS
+    elif isinstance(error, minimalmodbus.ModbusException):
+        return OTHER
+    elif isinstance(error, (serial.SerialException, OSError)):
+        return PORT_GONE
+    return OTHER
+
+
+class RetryPolicy:
+
+    def __init__(self, budgets=None, base_delay=0.05, max_delay=1.0):
+        self.budgets = dict(BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.attempts = {}
+
+    def reset(self):
+        """
+        Start fresh for the next parameter
+        """
+        self.attempts = {}
+
+    def next_delay(self, kind):
+        """
+        Use up one retry for the class, returns the seconds to wait
+        before retrying or None when the budget is spent
+        """
+        attempt = self.attempts.get(kind, 0)
+        if attempt >= self.budgets.get(kind, 0):
+            return None
+        self.attempts[kind] = attempt + 1
+        return min(self.max_delay, self.base_delay * 2 ** attempt)
@@ -0,0 +1,156 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import struct
+
+"""
+Modbus RTU framing helpers shared by the simulator and anything
+else that needs to build or check raw frames.
+
+Only the function codes the PowerFlex DSI port uses are covered,
+read holding registers (3), write single register (6) and write
+multiple registers (16).  Frames are bytes, the CRC is appended
+low byte first as the Modbus spec requires.
+"""
+
+READ_REGISTERS = 3
+WRITE_REGISTER = 6
+WRITE_REGISTERS = 16
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+ILLEGAL_DATA_VALUE = 3
+
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc16(data):
+    """
+    Modbus CRC16 of the data
+    """
+    crc = 0xFFFF
+    for b in data:
+        crc = (crc >> 8) ^ CRC_TABLE[(crc ^ b) & 0xFF]
+    return crc
+
+
+def append_crc(frame):
+    """
+    Return the frame with its CRC on the end
+    """
+    return bytes(frame) + struct.pack('<H', crc16(frame))
+
+
+def check_crc(frame):
+    """
+    True when the last two bytes are a valid CRC for the frame
+    """
+    if len(frame) < 4:
+        return False
+    return crc16(frame[:-2]) == struct.unpack('<H', frame[-2:])[0]
+
+
+# crc16 of each slave address followed by zeros, by frame length
+_slave_terms = {}
+
+
+def set_slave(frame, slave):
+    """
+    Return the frame addressed to another slave.  The CRC is linear,
+    changing the first byte changes it by a term that only depends
+    on the byte and the frame length, so it is patched without
+    running over the whole frame again.
+    """
+    length = len(frame) - 2
+    terms = _slave_terms.get(length)
+    if terms is None:
+        zeros = bytes(length - 1)
+        terms = _slave_terms[length] = [crc16(bytes([s]) + zeros) for s in range(256)]
+    crc = struct.unpack('<H', frame[-2:])[0] ^ terms[frame[0]] ^ terms[slave]
+    return bytes([slave]) + frame[1:-2] + struct.pack('<H', crc)
+
+
+def read_request(slave, start, count=1):
+    return append_crc(struct.pack('>BBHH', slave, READ_REGISTERS, start, count))
+
+
+def write_request(slave, register, value):
+    return append_crc(struct.pack('>BBHH', slave, WRITE_REGISTER, register, value & 0xFFFF))
+
+
+def write_multiple_request(slave, start, values):
+    body = struct.pack('>BBHHB', slave, WRITE_REGISTERS, start, len(values), len(values) * 2)
+    body += struct.pack('>{}H'.format(len(values)), *[v & 0xFFFF for v in values])
+    return append_crc(body)
+
+
+def exception_response(slave, function, code):
+    return append_crc(struct.pack('>BBB', slave, function | 0x80, code))
+
+
+def request_length(buffer):
+    """
+    Length of the request at the start of the buffer, or None
+    when not enough bytes have arrived to tell
+    """
+    if len(buffer) < 2:
+        return None
+    function = buffer[1]
+    if function == WRITE_REGISTERS:
+        if len(buffer) < 7:
+            return None
+        return 9 + buffer[6]
+    return 8
+
+
+def response_length(buffer):
+    """
+    Length of the response at the start of the buffer, or None
+    when not enough bytes have arrived to tell
+    """
+    if len(buffer) < 3:
+        return None
+    function = buffer[1]
+    if function & 0x80:
+        return 5
+    if function == READ_REGISTERS:
+        return 5 + buffer[2]
+    return 8
+
+
+def frame_time(length, baudrate, bits=10):
+    """
+    Seconds to send a frame of length bytes, 10 bits per
+    character for the 8N1 framing the writer uses
+    """
+    return length * float(bits) / baudrate
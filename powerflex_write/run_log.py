@@ -0,0 +1,124 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+"""
+Logging for a run of the gui, kept off the serial timing path.
+
+Records go onto a queue through RecordQueueHandler, which puts them on
+the queue as they are, and a QueueListener thread formats them and
+writes them to disk.  The stock QueueHandler formats on the calling
+thread.  A write never waits on formatting or the disk to log that it
+happened.  Arguments are formatted a moment later, so don't log objects
+that are changed right after.
+
+Each run gets its own file in output/logs, named for when it started,
+so a restart doesn't wipe the last run.  A file rotates when it gets
+past max_bytes, keeping backups of it, and only the newest runs are
+kept.
+"""
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records without formatting them, the
+    listener thread does that
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class RunLog:
+
+    def __init__(self, directory, name="logjammin", max_bytes=5 * 1024 * 1024, backups=5, runs=20):
+        self.directory = os.path.join(directory, "logs")
+        self.name = name
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.runs = runs
+
+        self.file_name = None
+        self.listener = None
+        self.handler = None
+
+    def start(self, level=logging.DEBUG):
+        """
+        Start logging the root logger to a new run file,
+        returns the logger
+        """
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.file_name = os.path.join(self.directory, "{}_{}.log".format(self.name, time.strftime("%Y%m%d_%H%M%S")))
+
+        file_handler = logging.handlers.RotatingFileHandler(self.file_name, maxBytes=self.max_bytes,
+                                                            backupCount=self.backups)
+        file_handler.setFormatter(logging.Formatter(FORMAT))
+
+        records = queue.SimpleQueue()
+        self.handler = RecordQueueHandler(records)
+        self.listener = logging.handlers.QueueListener(records, file_handler)
+        self.listener.start()
+
+        log = logging.getLogger()
+        log.addHandler(self.handler)
+        log.setLevel(level)
+        self._prune()
+        return log
+
+    def stop(self):
+        """
+        Write out anything still queued and close the file
+        """
+        if self.listener is None:
+            return
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+
+    def files(self):
+        """
+        Run log files, oldest first
+        """
+        if not os.path.exists(self.directory):
+            return []
+        prefix = self.name + "_"
+        return sorted(os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                      if f.startswith(prefix) and f.endswith(".log"))
+
+    def _prune(self):
+        """
+        Remove the oldest runs and their rotated backups
+        """
+        for old in self.files()[:-self.runs]:
+            for f in os.listdir(self.directory):
+                if f == os.path.basename(old) or f.startswith(os.path.basename(old) + "."):
+                    try:
+                        os.remove(os.path.join(self.directory, f))
+                    except OSError:
+                        pass
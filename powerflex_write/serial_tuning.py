@@ -0,0 +1,113 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import os
+import sys
+import time
+
+from powerflex_write import rtu
+
+"""
+Opt in tuning for USB RS485 adapters, to cut the time each Modbus
+transaction spends waiting on the adapter rather than the drive.
+
+USB serial adapters hold received bytes until their latency timer runs
+out, 16 ms by default on FTDI, so every response arrives late.  On Linux
+tune puts the port in low latency mode, which has the FTDI driver drop
+the timer to 1 ms, and locks the port so nothing else can open it part
+way through a run.  Other platforms set the latency timer in the
+driver's advanced port settings instead, only the lock is applied.
+
+The 0.5 s response timeout is also much longer than a drive needs, a
+miss waits all of it before the retry.  response_timeout sizes it from
+the baud rate: both frames on the wire, the drive's turnaround and a
+margin for the adapter.
+
+round_trips reads a register a number of times to show what the
+tuning achieved:
+    python tools.py rtt /dev/ttyUSB0 --baud 19200
+"""
+
+# time for the drive to answer, writes go to non-volatile memory
+DRIVE_TIME = 0.05
+
+# time for the adapter to pass the bytes along
+ADAPTER_TIME = 0.02
+
+
+def tune(serial_port):
+    """
+    Apply the tuning to an open pyserial port, returns what
+    was applied, None for settings this platform doesn't have
+    """
+    result = {"low_latency": None, "exclusive": False, "latency_timer": None}
+    if sys.platform.startswith("linux") and hasattr(serial_port, "set_low_latency_mode"):
+        try:
+            serial_port.set_low_latency_mode(True)
+            result["low_latency"] = True
+        except (OSError, ValueError):
+            # not a real serial port, a pty or a driver without it
+            result["low_latency"] = False
+        result["latency_timer"] = latency_timer(serial_port.port)
+
+    try:
+        serial_port.exclusive = True
+        result["exclusive"] = True
+    except (OSError, ValueError) as e:
+        result["exclusive"] = str(e)
+    return result
+
+
+def latency_timer(port):
+    """
+    The FTDI latency timer in ms, None when the adapter doesn't have one
+    """
+    name = os.path.basename(os.path.realpath(port or ""))
+    try:
+        with open("/sys/bus/usb-serial/devices/{}/latency_timer".format(name)) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def response_timeout(baudrate, max_block=1):
+    """
+    Timeout long enough for the biggest request the writer sends
+    and its response, at the baud rate
+    """
+    request = 9 + 2 * max_block
+    response = max(8, 5 + 2 * max_block)
+    return rtu.frame_time(request + response, baudrate) + DRIVE_TIME + ADAPTER_TIME
+
+
+def round_trips(comm, register, samples=20):
+    """
+    Read a register samples times, returns the round trip time
+    of each read that was answered and the number that failed
+    """
+    times = []
+    failed = 0
+    for _ in range(samples):
+        start = time.perf_counter()
+        try:
+            comm.read_register(register)
+            times.append(time.perf_counter() - start)
+        except Exception:
+            failed += 1
+    return times, failed
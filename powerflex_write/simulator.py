@@ -0,0 +1,214 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import logging
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+
+from powerflex_write import parameter_list
+from powerflex_write import rtu
+
+"""
+Simulated PowerFlex drive, a Modbus RTU slave for testing and
+benchmarking the writer without hardware.
+
+The register map is seeded from parameter_list for the chosen model,
+every known parameter starts at 0 except the drive type, which is set
+for the model.  Requests for parameters the model doesn't have get an
+illegal data address exception, just like a real drive.  The simulator
+can be served over a pty pair (Linux), the slave side name is passed to
+the writer as the com port, or called directly with handle() for
+in-process use.
+
+Latency is added to every response, and the baud rate is used to add
+the time it takes the frames to cross the wire.  Errors can be
+injected at a rate between 0 and 1, timeouts (no response), CRC errors
+(corrupted response) and illegal data address exceptions.
+
+Run from the command line to serve a drive until ctrl-c:
+    python tools.py simulate PF525
+"""
+
+
+class Simulator:
+
+    def __init__(self, model="PF525", slave=100, baudrate=9600, latency=0.0,
+                 timeout_rate=0.0, crc_error_rate=0.0, illegal_address_rate=0.0, seed=None, log=None):
+        self.model = model
+        self.slave = slave
+        self.baudrate = baudrate
+        self.latency = latency
+
+        self.timeout_rate = timeout_rate
+        self.crc_error_rate = crc_error_rate
+        self.illegal_address_rate = illegal_address_rate
+        self.random = random.Random(seed)
+
+        self.log = log or logging.getLogger(__name__)
+        self.registers = dict((p, 0) for p in parameter_list.get_parameters(model))
+        if model in parameter_list.IDENTITY:
+            self.registers[parameter_list.IDENTITY[model][0]] = parameter_list.DRIVE_TYPES[model][0]
+
+        self.requests = 0
+        self.errors = 0
+
+        # set False to act like the drive was unplugged
+        self.connected = True
+
+        self.master = None
+        self.slave_fd = None
+        self.port = None
+        self._thread = None
+        self._running = False
+
+    def open_pty(self):
+        """
+        Create the pty pair, returns the port name
+        to hand to the writer
+        """
+        self.master, self.slave_fd = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.log.info("Simulator - {} serving on {}".format(self.model, self.port))
+        return self.port
+
+    def start(self):
+        """
+        Serve requests on the pty from a background thread
+        """
+        if self.master is None:
+            self.open_pty()
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """
+        Stop serving and close the pty
+        """
+        self._running = False
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for fd in (self.master, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave_fd = None
+
+    def handle(self, request):
+        """
+        Process one request frame, returns the response frame
+        or None when there is no response
+        """
+        self.requests += 1
+        if not self.connected:
+            return None
+        if not rtu.check_crc(request):
+            self.log.info("Simulator - Dropping request with bad CRC")
+            return None
+        if request[0] not in (self.slave, 0):
+            return None
+
+        if self.timeout_rate and self.random.random() < self.timeout_rate:
+            self.errors += 1
+            self.log.info("Simulator - Injected timeout")
+            return None
+
+        response = self._execute(request)
+
+        # broadcasts are never answered
+        if request[0] == 0:
+            return None
+
+        if self.crc_error_rate and self.random.random() < self.crc_error_rate:
+            self.errors += 1
+            self.log.info("Simulator - Injected CRC error")
+            response = response[:-2] + bytes([response[-2] ^ 0xFF, response[-1]])
+        return response
+
+    def _execute(self, request):
+        """
+        Carry out the request against the register map
+        """
+        slave, function = request[0], request[1]
+        if function == rtu.READ_REGISTERS:
+            start, count = struct.unpack('>HH', request[2:6])
+            registers = range(start, start + count)
+        elif function == rtu.WRITE_REGISTER:
+            start, value = struct.unpack('>HH', request[2:6])
+            registers = [start]
+        elif function == rtu.WRITE_REGISTERS:
+            start, count = struct.unpack('>HH', request[2:6])
+            registers = range(start, start + count)
+        else:
+            self.errors += 1
+            return rtu.exception_response(slave, function, rtu.ILLEGAL_FUNCTION)
+
+        illegal = any(r not in self.registers for r in registers)
+        if not illegal and self.illegal_address_rate:
+            illegal = self.random.random() < self.illegal_address_rate
+        if illegal:
+            self.errors += 1
+            self.log.info("Simulator - Illegal data address {}".format(start))
+            return rtu.exception_response(slave, function, rtu.ILLEGAL_DATA_ADDRESS)
+
+        if function == rtu.READ_REGISTERS:
+            values = [self.registers[r] for r in registers]
+            body = struct.pack('>BBB', slave, function, count * 2)
+            body += struct.pack('>{}H'.format(count), *values)
+            return rtu.append_crc(body)
+        elif function == rtu.WRITE_REGISTER:
+            self.registers[start] = value
+        else:
+            values = struct.unpack('>{}H'.format(count), request[7:7 + count * 2])
+            self.registers.update(zip(registers, values))
+        return rtu.append_crc(request[:6])
+
+    def _serve(self):
+        """
+        Read frames from the pty and answer them
+        """
+        buffer = b''
+        while self._running:
+            ready, _, _ = select.select([self.master], [], [], 0.05)
+            if not ready:
+                # a gap on the line ends any partial frame
+                buffer = b''
+                continue
+            try:
+                buffer += os.read(self.master, 256)
+            except OSError:
+                continue
+
+            length = rtu.request_length(buffer)
+            while length and len(buffer) >= length:
+                request, buffer = buffer[:length], buffer[length:]
+                time.sleep(rtu.frame_time(len(request), self.baudrate) + self.latency)
+                response = self.handle(request)
+                if response:
+                    time.sleep(rtu.frame_time(len(response), self.baudrate))
+                    os.write(self.master, response)
+                length = rtu.request_length(buffer)
@@ -0,0 +1,327 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import minimalmodbus
+import socket
+import struct
+import time
+
+from powerflex_write import capture
+from powerflex_write import frame_cache
+from powerflex_write import rtu
+from powerflex_write import serial_tuning
+
+"""
+Transports carry register reads and writes to a drive.  The writer,
+cloner, watcher and identify code only use what every transport has:
+read_register, write_register, write_registers, the slave address,
+timeout and baud rate, and reopen/close.  prepare() hands over the
+writes of a plan before they're sent, so their frames are built once
+and reused for every drive.
+
+    RtuTransport        RS485 adapter on a com port, using minimalmodbus
+    TcpTransport        Modbus TCP, through an RS485 to Ethernet gateway
+    SimulatorTransport  a simulator.Simulator in the same process
+
+open_transport picks one from the port name, so any of them can be
+typed into the com port box:
+    COM3, /dev/ttyUSB0      RtuTransport
+    tcp://10.0.0.50:502     TcpTransport
+    sim://PF525             SimulatorTransport
+    replay://session.pfwcap SimulatorTransport playing back a capture
+
+Errors are raised as the same minimalmodbus exceptions for all of them,
+so the retry policy treats them alike.  Every transport can record its
+frames to a capture.Capture, record(None) stops recording.  Writes with the address set to
+0 are broadcasts, every drive on the bus takes them and none answer.
+"""
+
+BROADCAST = 0
+
+# time for the drives to act on a broadcast before the next request
+BROADCAST_DELAY = 0.2
+
+
+def open_transport(port, address=100, baudrate=9600, timeout=0.5):
+    """
+    Make the transport for a port name
+    """
+    if port.startswith("tcp://"):
+        host, _, tcp_port = port[6:].partition(":")
+        return TcpTransport(host, int(tcp_port or 502), address, timeout)
+    elif port.startswith("sim://"):
+        # imported here, the simulator needs a POSIX system
+        from powerflex_write.simulator import Simulator
+        return SimulatorTransport(Simulator(port[6:] or "PF525", slave=address), address, port)
+    elif port.startswith("replay://"):
+        from powerflex_write.replay import ReplaySlave
+        return SimulatorTransport(ReplaySlave(port[9:]), address, port)
+    return RtuTransport(port, address, baudrate, timeout)
+
+
+def check_response(request, response):
+    """
+    Validate a response frame against its request, raising the
+    minimalmodbus exception a serial instrument would
+    """
+    if not response:
+        raise minimalmodbus.NoResponseError("No communication with the instrument (no answer)")
+    if not rtu.check_crc(response):
+        raise minimalmodbus.InvalidResponseError("CRC error in response {!r}".format(response))
+    if response[0] != request[0]:
+        raise minimalmodbus.InvalidResponseError("Wrong slave address in response {!r}".format(response))
+    if response[1] & 0x80:
+        if response[2] in (rtu.ILLEGAL_FUNCTION, rtu.ILLEGAL_DATA_ADDRESS, rtu.ILLEGAL_DATA_VALUE):
+            raise minimalmodbus.IllegalRequestError("Slave reported illegal request, code {}".format(response[2]))
+        raise minimalmodbus.SlaveReportedException("Slave reported exception code {}".format(response[2]))
+    return response
+
+
+def check_expected(request, response, expected):
+    """
+    Validate a response against the frame it should match,
+    working out what went wrong only when it doesn't
+    """
+    if response == expected:
+        return response
+    check_response(request, response)
+    raise minimalmodbus.InvalidResponseError("Unexpected response {!r} to {!r}".format(response, request))
+
+
+class RtuTransport:
+
+    def __init__(self, port, address=100, baudrate=9600, timeout=0.5):
+        self.port = port
+        self.instrument = minimalmodbus.Instrument(port, address)
+        self.instrument.mode = minimalmodbus.MODE_RTU
+        self.instrument.serial.baudrate = baudrate
+        self.instrument.serial.timeout = timeout
+        self.frames = frame_cache.FrameCache()
+
+    @property
+    def address(self):
+        return self.instrument.address
+
+    @address.setter
+    def address(self, value):
+        self.instrument.address = value
+
+    @property
+    def timeout(self):
+        return self.instrument.serial.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.instrument.serial.timeout = value
+
+    @property
+    def baudrate(self):
+        return self.instrument.serial.baudrate
+
+    @baudrate.setter
+    def baudrate(self, value):
+        self.instrument.serial.baudrate = value
+
+    def read_register(self, register):
+        return self.instrument.read_register(register)
+
+    def read_registers(self, start, count):
+        return self.instrument.read_registers(start, count)
+
+    def write_register(self, register, value):
+        # function 16, the same request minimalmodbus would build
+        self.write_registers(register, [value])
+
+    def write_registers(self, start, values):
+        request, expected = self.frames.write_multiple(self.address, start, values)
+        # minimalmodbus still keeps the silent period, local echo
+        #   and broadcast delay, only the frames are our own
+        # _communicate is private, requirements.txt pins minimalmodbus to 2.1.x
+        if self.address == BROADCAST:
+            self.instrument._communicate(request, 0)
+        else:
+            check_expected(request, self.instrument._communicate(request, len(expected)), expected)
+
+    def prepare(self, writes):
+        self.frames.use(writes)
+
+    def tune(self):
+        return serial_tuning.tune(self.instrument.serial)
+
+    def record(self, session):
+        """
+        Record the bytes going through the port to session
+        """
+        serial_port = self.instrument.serial
+        if isinstance(serial_port, capture.CaptureSerial):
+            serial_port = serial_port.serial
+        self.instrument.serial = capture.CaptureSerial(serial_port, session) if session else serial_port
+
+    def reopen(self):
+        # minimalmodbus keeps the port cached, reopen the same one
+        self.instrument.serial.close()
+        self.instrument.serial.open()
+
+    def close(self):
+        self.instrument.serial.close()
+
+
+class FrameTransport:
+    """
+    Transports that build the request frames themselves,
+    subclasses only have to carry a frame there and back
+    """
+
+    broadcast_delay = BROADCAST_DELAY
+
+    def __init__(self, address=100, timeout=0.5, baudrate=9600):
+        self.address = address
+        self.timeout = timeout
+        self.baudrate = baudrate
+        self.frames = frame_cache.FrameCache()
+        self.session = None
+
+    def read_register(self, register):
+        return self.read_registers(register, 1)[0]
+
+    def read_registers(self, start, count):
+        if self.address == BROADCAST:
+            raise ValueError("Can't read with the broadcast address")
+        request = rtu.read_request(self.address, start, count)
+        response = check_response(request, self._exchange(request))
+        return list(struct.unpack('>{}H'.format(count), response[3:3 + 2 * count]))
+
+    def write_register(self, register, value):
+        # function 16 like minimalmodbus, the drive sees the same request
+        self.write_registers(register, [value])
+
+    def write_registers(self, start, values):
+        request, expected = self.frames.write_multiple(self.address, start, values)
+        if self.address == BROADCAST:
+            if self.session:
+                self.session.record(capture.REQUEST, request)
+            self.send(request)
+            time.sleep(self.broadcast_delay)
+        else:
+            check_expected(request, self._exchange(request), expected)
+
+    def prepare(self, writes):
+        self.frames.use(writes)
+
+    def _exchange(self, request):
+        if self.session:
+            self.session.record(capture.REQUEST, request)
+        response = self.transact(request)
+        if self.session:
+            self.session.record(capture.RESPONSE, response or b'')
+        return response
+
+    def transact(self, request):
+        raise NotImplementedError
+
+    def tune(self):
+        # no serial port of our own to tune
+        return {}
+
+    def record(self, session):
+        self.session = session
+
+    def send(self, request):
+        """
+        Send a request that gets no response
+        """
+        self.transact(request)
+
+    def reopen(self):
+        self.close()
+
+    def close(self):
+        pass
+
+
+class TcpTransport(FrameTransport):
+    """
+    Modbus TCP, the unit id is the drive's slave address on
+    the RS485 side of the gateway
+    """
+
+    def __init__(self, host, port=502, address=100, timeout=0.5):
+        super(TcpTransport, self).__init__(address, timeout)
+        self.host = host
+        self.tcp_port = port
+        self.port = "tcp://{}:{}".format(host, port)
+        self.sock = None
+        self.transaction_id = 0
+
+    def transact(self, request):
+        """
+        Send the RTU frame as a Modbus TCP request, returns
+        the response as an RTU frame
+        """
+        self.send(request)
+        try:
+            while True:
+                header = self._receive(7)
+                transaction_id, _, length, unit = struct.unpack('>HHHB', header)
+                pdu = self._receive(length - 1)
+                # skip late answers to requests that already timed out
+                if transaction_id == self.transaction_id:
+                    return rtu.append_crc(bytes([unit]) + pdu)
+        except socket.timeout:
+            return None
+
+    def send(self, request):
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.tcp_port), self.timeout)
+        self.sock.settimeout(self.timeout)
+
+        pdu = request[1:-2]
+        self.transaction_id = (self.transaction_id + 1) & 0xFFFF
+        self.sock.sendall(struct.pack('>HHHB', self.transaction_id, 0, len(pdu) + 1, request[0]) + pdu)
+
+    def _receive(self, length):
+        data = b''
+        while len(data) < length:
+            chunk = self.sock.recv(length - len(data))
+            if not chunk:
+                self.close()
+                raise ConnectionError("Gateway {} closed the connection".format(self.port))
+            data += chunk
+        return data
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class SimulatorTransport(FrameTransport):
+    """
+    Hands frames straight to a simulator in this process
+    """
+
+    broadcast_delay = 0
+
+    def __init__(self, simulator, address=100, port=None):
+        super(SimulatorTransport, self).__init__(address)
+        self.simulator = simulator
+        self.port = port or "sim://{}".format(simulator.model)
+
+    def transact(self, request):
+        return self.simulator.handle(request)
@@ -17,10 +17,22 @@ specific language governing permissions and limitations
 under the License.
 """
 
-import minimalmodbus
+import hashlib
 import os
 import time
 
+from powerflex_write import capture
+from powerflex_write import drive_queue
+from powerflex_write import estimate
+from powerflex_write import hotplug
+from powerflex_write import identify
+from powerflex_write import journal
+from powerflex_write import metrics
+from powerflex_write import parameter_list
+from powerflex_write import planner
+from powerflex_write import retry
+from powerflex_write import serial_tuning
+from powerflex_write import transport
 from tkinter import messagebox
 
 """
@@ -32,8 +44,87 @@ Calling write will search the output directory for files names that start with
 A successful write will move file to the completed directory.  Unsuccessful writes
 will leave the file, which will need to be inspected for a typo.  These files are typically
 auto-generated, so there shouldn't be typos unless they have been manually edited.
+
+A file can start from a shared base set with a #base=<hash> line, its own parameters
+then override the base.  Bases are kept in the bases directory next to the file, or
+next to the directory it's in for completed files, see param_store.
 """
 
+BASE_DIR = "bases"
+
+# compiled base sets by path, a base's name is the hash
+#   of its contents so they never go stale
+_bases = {}
+
+
+def compile_file(file_name):
+    """
+    Read a text file into the drive model and a write
+    plan, a list of (parameter, value) in file order
+    """
+    plan = []
+    base = None
+    with open(file_name, 'r') as parm_file:
+        drive_model = ''
+        for line in parm_file:
+            if line == '\n':
+                pass
+            elif line.startswith('*'):
+                drive_model = line[1:].strip()
+            elif line.startswith('#base='):
+                base = line.split('=', 1)[1].strip()
+            elif line.startswith('#'):
+                pass
+            else:
+                s = line.split(':')
+                plan.append((int(s[0]), int(s[2])))
+
+    if base:
+        base_model, base_plan = compile_base(os.path.dirname(os.path.abspath(file_name)), base)
+        drive_model = drive_model or base_model
+        plan = apply_overrides(base_plan, plan)
+    return drive_model, plan
+
+
+def compile_base(directory, name):
+    """
+    Compile a base set once, later drives get the cached plan
+    """
+    for d in (directory, os.path.dirname(directory)):
+        path = os.path.join(d, BASE_DIR, name + '.vfd')
+        if path in _bases:
+            return _bases[path]
+        if os.path.exists(path):
+            _bases[path] = compile_file(path)
+            return _bases[path]
+    raise OSError("Base {} not found for {}".format(name, directory))
+
+
+def apply_overrides(base, overrides):
+    """
+    The base plan with the overridden values swapped in,
+    parameters the base doesn't have go on the end
+    """
+    values = dict(overrides)
+    plan = [(p, values.get(p, v)) for p, v in base]
+    names = set(p for p, _ in base)
+    plan.extend((p, v) for p, v in overrides if p not in names)
+    return plan
+
+
+def batch_plan(plan, max_block):
+    """
+    Group a write plan into blocks of consecutive parameters,
+    keeping the plan order, returns a list of (start, [values])
+    """
+    blocks = []
+    for parameter, value in plan:
+        if blocks and blocks[-1][0] + len(blocks[-1][1]) == parameter and len(blocks[-1][1]) < max_block:
+            blocks[-1][1].append(value)
+        else:
+            blocks.append((parameter, [value]))
+    return blocks
+
 
 class Writer:
 
@@ -47,96 +138,528 @@ class Writer:
         self.callback = None
         self.com_port = None
         self.comm = None
+        self.current_drive = None
+        self.metrics = metrics.Metrics()
+        self.journal = journal.Journal(os.path.join(self.current_dir, "journal.jsonl"))
+        self.retry_policy = retry.RetryPolicy()
 
-    def write(self, callback):
+        # serial settings and the pause before each write
+        self.baudrate = 9600
+        self.timeout = 0.5
+        self.delay = 0.1
+
+        # low latency mode, exclusive access and a timeout sized
+        # from the baud rate, see serial_tuning
+        self.tune_serial = False
+
+        # capture.Capture recording every frame, see start_capture
+        self.capture = None
+
+        # watch for drives being plugged in instead of prompting
+        self.auto_detect = False
+        self.watcher = hotplug.ConnectionWatcher(self)
+
+        # identify each drive and match it to its file, any order
+        self.auto_match = False
+
+        # file_watcher index of the output directory, when set it
+        # is used instead of listing the directory
+        self.file_index = None
+
+        # order the files are written in
+        self.queue = drive_queue.DriveQueue(self.current_dir)
 
-        self.callback = callback
+        # put comm settings last in each plan, and optionally have the
+        # drive reset and check it answers at its new settings
+        self.plan_writes = True
+        self.auto_reset = False
 
+        # most registers allowed in a single write multiple request
+        self.max_block = 16
+
+        # every drive is on the bus at once, send the parameters
+        # they all share as a broadcast
+        self.broadcast = False
+
+        # set while writing, and by cancel() to stop at the
+        #   next wait for a drive
+        self.running = False
+        self.cancelled = False
+
+    def write(self, callback):
+
+        if not self._start():
+            return
         try:
-            self.com_port = self.parent.port_val.get()
-            self.parent.log.info("Writer - Starting connection to drive")
-            self.comm = minimalmodbus.Instrument(self.com_port, 100)
-            self.comm.serial.baudrate = 9600
-            self.comm.serial.timeout = 0.5
-            self.comm.mode = minimalmodbus.MODE_RTU
-        except (Exception, ):
-            self.parent.log.info("Writer - Failed to open {}, quitting".format(self.com_port))
+            self.callback = callback
+            if not self._begin_run():
+                return
+
+            # process all the drive files
+            if self.broadcast:
+                self._broadcast_drives()
+            else:
+                self._process_drives()
+        finally:
+            self.running = False
+
+    def _begin_run(self):
+        """
+        Start new metrics and a new journal run, then open the
+        port.  Returns False, after telling the user, when the
+        port didn't open.
+        """
+        self.metrics = metrics.Metrics()
+        self.journal.close()
+        if not self.journal.open():
+            self.parent.log.info("Writer - Failed to open journal {}".format(self.journal.file_name))
+        if not self._connect():
+            messagebox.showinfo("Information", "Failed to open {}!".format(self.com_port))
+            return False
+        return True
+
+    def cancel(self):
+        """
+        Stop the running write at the next wait for a drive
+        """
+        if self.running:
+            self.parent.log.info("Writer - Cancelling write")
+            self.cancelled = True
+
+    def _start(self):
+        """
+        Mark a write as running, returns False if one already
+        is.  Waiting for a drive keeps the GUI alive, so the
+        operator can ask for another write in the meantime.
+        """
+        if self.running:
+            self.parent.log.info("Writer - Already writing, ignoring request")
+            return False
+        self.running = True
+        self.cancelled = False
+        return True
 
-        # process all the drive files
-        self._process_drives()
+    def dry_run(self, batch=False):
+        """
+        Estimate how long writing every pending file will take
+        without a drive connected, returns the estimate and
+        shows it to the user
+        """
+        self.parent.log.info("Writer - Estimating write time")
+        drives = []
+        for drive in self._get_text_files():
+            try:
+                model, plan = compile_file(os.path.join(self.current_dir, drive))
+            except (OSError, ValueError, IndexError) as e:
+                self.parent.log.info("Writer - Failed to read {}, {}".format(drive, e))
+                continue
+            if self.plan_writes:
+                plan = planner.order(model, plan)[0]
+            result = estimate.estimate_plan(plan, self.baudrate, self.delay, batch, self.max_block)
+            result["drive"] = drive
+            drives.append(result)
+
+        total = sum(d["seconds"] for d in drives)
+        self.parent.log.info("Writer - Estimated {:.1f}s for {} drives".format(total, len(drives)))
+        messagebox.showinfo("Information", estimate.report(drives, self.baudrate, self.delay))
+        return {"drives": drives, "seconds": total}
+
+    def start_capture(self):
+        """
+        Record every frame to a new capture file in the
+        output directory, returns the file name
+        """
+        self.stop_capture()
+        file_name = os.path.join(self.current_dir, "capture_{}.pfwcap".format(time.strftime("%Y%m%d_%H%M%S")))
+        self.capture = capture.Capture(file_name, self.baudrate)
+        self.capture.open()
+        if self.comm is not None:
+            self.comm.record(self.capture)
+        self.parent.log.info("Writer - Recording frames to {}".format(file_name))
+        return file_name
+
+    def stop_capture(self):
+        if self.capture is None:
+            return
+        if self.comm is not None:
+            self.comm.record(None)
+        self.capture.close()
+        self.parent.log.info("Writer - Recorded {} frames to {}".format(self.capture.frames, self.capture.file_name))
+        self.capture = None
 
     def write_single_drive(self, drive):
 
+        self.write_batch([drive])
+
+    def write_batch(self, drives, callback=None):
+        """
+        Write a selection of files as one job.  The port is opened
+        once and every file is compiled before the first write, the
+        results are reported together at the end.
+        """
+        if not self._start():
+            return None
+        try:
+            return self._write_batch(drives, callback)
+        finally:
+            self.running = False
+
+    def _write_batch(self, drives, callback):
+        if callback:
+            self.callback = callback
+        if not self._begin_run():
+            return None
+
+        plans = {}
+        failed = []
+        for drive in drives:
+            try:
+                plans[drive] = compile_file(os.path.join(self.current_dir, drive))
+            except (OSError, ValueError, IndexError) as e:
+                self.parent.log.info("Writer - Failed to read {}, {}".format(drive, e))
+                failed.append(drive)
+
+        written = []
+        for drive in drives:
+            if drive not in plans:
+                continue
+            connected = self._connect_drive([drive])
+            if self.cancelled:
+                self.parent.log.info("Writer - Batch cancelled")
+                break
+            if connected is None:
+                failed.append(drive)
+            elif self._write_drive(drive, plans[drive]):
+                failed.append(drive)
+            else:
+                written.append(drive)
+            self._wait_for_unplug()
+
+        self._export_metrics()
+        self.parent.log.info("Writer - Batch wrote {} of {} drives".format(len(written), len(drives)))
+        message = "Wrote {} of {} drives.".format(len(written), len(drives))
+        if failed:
+            message += "\n\nFailed:\n" + "\n".join(failed)
+        messagebox.showinfo("Information", message)
+        return failed
+
+    def _write_drive(self, drive, compiled=None):
+        """
+        Write a drive file, moving it to the completed directory
+        when successful.  compiled is the (model, plan) of the
+        file when it has already been read.
+        """
+        self.parent.log.info("Writer - Writing to {}".format(drive[:-4]))
         p1 = os.path.abspath(self.current_dir + '/' + drive)
-        p2 = os.path.abspath(self.completed_dir + '/' + drive)
 
-        result = self._parse_file(p1)
+        self.current_drive = drive
+        self.journal.drive(drive, journal.STARTED)
+        if compiled:
+            result = self._write_plan(*compiled)
+        else:
+            result = self._parse_file(p1)
 
         if result:
-            # failed to write, notify the user
-            self.parent.log.info("Writer - Failed to write to {}. Make sure there were no typo's in the file".
+            # failed to write and the user gave up on retrying, leave the file
+            self.parent.log.error("Writer - Failed to write to {}. Make sure there were no typo's in the file".
                                  format(drive[:-4]))
-            retry = self._yes_or_no()
+            self.journal.drive(drive, journal.FAILED)
+            if self.file_index:
+                self.file_index.mark_failed(drive)
         else:
-            try:
-                os.rename(p1, p2)
-                self.callback(drive)
-                retry = False
-            except OSError:
-                self.parent.log.info("Writer - File {} already exists in completed directory".format(drive))
-                retry = False
+            # journal first, if we crash before the move it's finished on the next start
+            self.journal.drive(drive, journal.COMPLETED, self._digest(p1))
+            self._complete(drive)
+        return result
+
+    def _complete(self, drive):
+        """
+        Move a written file to the completed directory, replacing
+        an older copy in one step
+        """
+        p1 = os.path.abspath(self.current_dir + '/' + drive)
+        p2 = os.path.abspath(self.completed_dir + '/' + drive)
+        if not os.path.exists(self.completed_dir):
+            os.makedirs(self.completed_dir)
+        if os.path.exists(p2):
+            self.parent.log.info("Writer - Replacing {} in completed directory".format(drive))
+        try:
+            os.replace(p1, p2)
+        except OSError as e:
+            self.parent.log.info("Writer - Failed to move {} to completed directory, {}".format(drive, e))
+            return
+        self.journal.drive(drive, journal.MOVED)
+        if self.callback:
+            self.callback(drive)
+
+    def _recover(self, drive_list):
+        """
+        Finish moving files the journal says were written but
+        never moved, returns the files that still need writing.
+        A file regenerated after it was moved is written again,
+        even when it's the same.
+        """
+        states = self.journal.states()
+        remaining = []
+        for drive in drive_list:
+            state, digest = states.get(drive, (None, None))
+            if state == journal.COMPLETED and digest == self._digest(os.path.join(self.current_dir, drive)):
+                self.parent.log.info("Writer - Journal shows {} was written, moving it".format(drive))
+                self._complete(drive)
+            else:
+                remaining.append(drive)
+        return remaining
+
+    def _digest(self, file_name):
+        with open(file_name, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
 
     def _process_drives(self):
         """
         Start processing files
         """
         drive_list = self._get_text_files()
-        retry = True
 
         # create completed directory
         if not os.path.exists(self.completed_dir):
             self.parent.log.info("Writer - creating completed directory")
             os.makedirs(self.completed_dir)
 
+        drive_list = self._recover(drive_list)
+
         if not drive_list:
             self.parent.log.info("Writer - No files to write")
             messagebox.showinfo("Information", "No files to write!")
             return
 
-        for drive in drive_list:
-            while retry:
-                # prompt the user to plug into a drive
-                self.parent.log.info("Writer - Waiting to connect to {}".format(drive[:-4]))
-                messagebox.showinfo("Information", "Connect to {} then press OK to continue".format(drive[:-4]))
-
-                self.parent.log.info("Writer - Writing to {}".format(drive[:-4]))
-                p1 = os.path.abspath(self.current_dir + '/' + drive)
-                p2 = os.path.abspath(self.completed_dir + '/' + drive)
-                result = self._parse_file(p1)
-
-                if result:
-                    # failed to write, notify the user
-                    self.parent.log.info("Writer - Failed to write to {}. Make sure there were no typo's in the file".
-                                         format(drive[:-4]))
-                    retry = self._yes_or_no()
-                else:
-                    try:
-                        os.rename(p1, p2)
-                        self.callback(drive)
-                        retry = False
-                    except OSError:
-                        self.parent.log.info("Writer - File {} already exists in completed directory".format(drive))
-                        retry = False
-
-            retry = True
+        self.queue.sync(drive_list)
+        self.queue.reset_failures()
+        self.queue.completed.update(self._completed_files())
+
+        index = identify.DriveIndex(self.current_dir, drive_list) if self.auto_match else None
+        pending = self.queue.ready()
+        while pending:
+            drive = self._connect_drive(pending, index)
+            if self.cancelled:
+                self.parent.log.info("Writer - Write cancelled")
+                break
+            if drive is None:
+                # connected drive didn't match, see if the user wants to keep going
+                if not self._yes_or_no("No file matches this drive, do you want to connect another?"):
+                    break
+            elif self._write_drive(drive):
+                # failed, the rest of the drives go first
+                self.queue.requeue(drive)
+            else:
+                self.queue.complete(drive)
+                if index:
+                    index.remove(drive)
+
+            self._wait_for_unplug()
+
+            if self.file_index:
+                # pick up files that showed up or went away during the run
+                current = self._get_text_files()
+                if index:
+                    for f in set(current) - set(self.queue.position):
+                        index.add(f)
+                    for f in set(self.queue.position) - set(current):
+                        index.remove(f)
+                self.queue.sync(current)
+            pending = self.queue.ready()
+
+        if self.queue.blocked():
+            self.parent.log.info("Writer - Files waiting on drives that weren't written: {}".format(
+                self.queue.blocked()))
         self.parent.log.info("Writer - Finished writing all drive files")
+        self._export_metrics()
         messagebox.showinfo("Information", "Writing VFD parameters complete!")
 
+    def _broadcast_drives(self):
+        """
+        Write every file to drives wired to the same bus.  Parameters
+        all the files share are broadcast once, then each drive is read
+        back at its node address and gets the rest of its file.
+        """
+        drive_list = self._recover(self._get_text_files())
+        if not drive_list:
+            self.parent.log.info("Writer - No files to write")
+            messagebox.showinfo("Information", "No files to write!")
+            return
+
+        failed = []
+        drives, plans = [], []
+        for drive in drive_list:
+            try:
+                model, plan = compile_file(os.path.join(self.current_dir, drive))
+            except (OSError, ValueError, IndexError) as e:
+                self.parent.log.info("Writer - Failed to read {}, {}".format(drive, e))
+                failed.append(drive)
+                continue
+            drives.append(drive)
+            plans.append((model, plan))
+
+        models = set(m for m, _ in plans)
+        if len(models) > 1:
+            self.parent.log.info("Writer - Files are for different models {}".format(sorted(models)))
+            messagebox.showinfo("Information", "Files must all be for the same drive model to broadcast!")
+            return
+        model = models.pop() if models else ""
+
+        node = parameter_list.NODE_ADDRESS.get(model)
+        addresses = [dict(plan).get(node) for _, plan in plans]
+        if None in addresses or len(set(addresses)) < len(addresses):
+            self.parent.log.info("Writer - Node addresses {} aren't unique".format(addresses))
+            messagebox.showinfo("Information", "Every file needs its own node address to broadcast!")
+            return
+
+        common, remaining = planner.shared(model, [plan for _, plan in plans])
+        self.parent.log.info("Writer - Broadcasting {} parameters shared by {} drives".format(
+            len(common), len(drives)))
+        with self.metrics.timer("prompt"):
+            messagebox.showinfo("Information", "Connect all {} drives to the bus then press OK".format(len(drives)))
+
+        original = self.comm.address
+        try:
+            self.metrics.start_drive("broadcast")
+            self.current_drive = "broadcast"
+            self.comm.address = transport.BROADCAST
+            if self._send_plan(model, common, batch=True):
+                # nothing is known to have landed, write it all to each drive
+                self.parent.log.info("Writer - Broadcast failed, writing each drive in full")
+                remaining = [plan for _, plan in plans]
+                common = []
+
+            for drive, address, plan in zip(drives, addresses, remaining):
+                self.metrics.start_drive(drive)
+                self.comm.address = address
+                missed = self._verify(common)
+                if missed:
+                    self.parent.log.info("Writer - {} missed {} broadcast parameters".format(drive, len(missed)))
+                if self._write_drive(drive, (model, missed + plan)):
+                    failed.append(drive)
+        finally:
+            self.comm.address = original
+
+        self._export_metrics()
+        self.parent.log.info("Writer - Broadcast wrote {} of {} drives".format(
+            len(drive_list) - len(failed), len(drive_list)))
+        message = "Wrote {} of {} drives.".format(len(drive_list) - len(failed), len(drive_list))
+        if failed:
+            message += "\n\nFailed:\n" + "\n".join(failed)
+        messagebox.showinfo("Information", message)
+
+    def _verify(self, plan):
+        """
+        Read the plan back from the drive, returns the parameters
+        that don't match.  A block that can't be read is returned
+        whole, so it gets written individually.
+        """
+        missed = []
+        for start, values in self._batch_plan(plan):
+            try:
+                with self.metrics.timer("wire"):
+                    actual = self.comm.read_registers(start, len(values))
+            except Exception as e:
+                self.parent.log.info("Writer - Failed to read back {} parameters at {}, {}".format(
+                    len(values), start, e))
+                actual = [None] * len(values)
+            missed.extend((start + i, v) for i, (v, a) in enumerate(zip(values, actual)) if v != a)
+        return missed
+
+    def _wait_for_unplug(self):
+        """
+        With auto detect, beep so the operator knows they can
+        move on and wait for them to unplug
+        """
+        if not self.auto_detect:
+            return
+        bell = getattr(self.parent, "bell", None)
+        if bell:
+            bell()
+        with self.metrics.timer("prompt"):
+            self.watcher.wait_for_disconnect()
+
+    def _connect_drive(self, pending, index=None):
+        """
+        Wait for the user to plug into a drive, returns the file
+        to write to it.  Without an index that's the next file in
+        order, with one the drive is identified and matched.
+        """
+        name = "the next drive" if index else pending[0][:-4]
+        self.parent.log.info("Writer - Waiting to connect to {}".format(name))
+        start = time.perf_counter()
+        if self.auto_detect:
+            if not self.watcher.wait_for_drive():
+                return None
+        else:
+            messagebox.showinfo("Information", "Connect to {} then press OK to continue".format(name))
+        waited = time.perf_counter() - start
+
+        if index:
+            identity = identify.read_identity(self.comm, index.models())
+            drive = index.match(identity, pending)
+            self.parent.log.info("Writer - Drive {} matched to {}".format(identity, drive))
+            if drive is None:
+                drive = self._choose_file(identity, index.candidates(identity, pending))
+        else:
+            drive = pending[0]
+            if self.auto_detect and not self._is_model(drive):
+                drive = None
+
+        if drive:
+            self.metrics.start_drive(drive)
+            self.metrics.add_time("prompt", waited)
+        return drive
+
+    def _is_model(self, drive):
+        """
+        Check the connected drive is the model the file is for
+        """
+        try:
+            model = compile_file(os.path.join(self.current_dir, drive))[0]
+        except (OSError, ValueError, IndexError):
+            # left for the write to report
+            return True
+        if self.watcher.identify(model) is None:
+            self.parent.log.info("Writer - Connected drive isn't the {} {} is for".format(model, drive))
+            return False
+        return True
+
+    def _choose_file(self, identity, candidates):
+        """
+        Offer the next file in queue order for a drive that
+        didn't match one, returns None if the user declined
+        """
+        if not candidates:
+            return None
+        drive = candidates[0]
+        question = "No file sets the address of this {} drive, do you want to write {} to it?".format(
+            identity["model"], drive[:-4])
+        if not self._yes_or_no(question):
+            return None
+        self.parent.log.info("Writer - User chose {} for drive {}".format(drive, identity))
+        return drive
+
+    def _completed_files(self):
+        """
+        Files already in the completed directory
+        """
+        if self.file_index:
+            return set(self.file_index.completed)
+        if not os.path.exists(self.completed_dir):
+            return set()
+        return set(f for f in os.listdir(self.completed_dir) if f.endswith('.vfd'))
+
     def _get_text_files(self):
         """
         Find all text files in the current directory
         and return them as a list
         """
+        if self.file_index:
+            self.file_index.poll()
+            return self.file_index.sorted_pending()
+
         drive_files = []
         for text_file in os.listdir(self.current_dir):
             if text_file.endswith('.vfd'):
@@ -146,12 +669,13 @@ class Writer:
         self.parent.log.info("Writer - Retrieved VFD files")
         return drive_files
 
-    def _yes_or_no(self):
+    def _yes_or_no(self, question="Failed to write to drive, do you want to try again?"):
         """
         Prompt user with yes/no retry when failing to write to a drive
         """
         self.parent.log.info("Writer - Asking user to retry")
-        reply = messagebox.askquestion("Information", "Failed to write to drive, do you want to try again?")
+        with self.metrics.timer("prompt"):
+            reply = messagebox.askquestion("Information", question)
         self.parent.log.info("Writer - User chose {} to retry".format(reply))
         if reply == 'yes':
             return True
@@ -160,36 +684,211 @@ class Writer:
         else:
             return False
 
+    def _connect(self):
+        """
+        Open the com port to the drive, returns True
+        when the port opened
+        """
+        ports = getattr(self.parent, "ports", None)
+        try:
+            self.com_port = self.parent.port_val.get()
+            if ports:
+                # follow the adapter if it came back on another port
+                self.com_port = ports.resolve(self.com_port)
+            self.parent.log.info("Writer - Starting connection to drive")
+            if self.comm is not None and self.comm.port == self.com_port:
+                self.comm.reopen()
+            else:
+                if self.comm is not None:
+                    self.comm.close()
+                self.comm = transport.open_transport(self.com_port, 100, self.baudrate, self.timeout)
+            self.comm.baudrate = self.baudrate
+            self.comm.timeout = self.timeout
+            if self.tune_serial:
+                self._tune()
+            self.comm.record(self.capture)
+            if ports:
+                ports.remember(self.com_port)
+            return True
+        except (Exception, ):
+            self.parent.log.info("Writer - Failed to open {}, quitting".format(self.com_port))
+            return False
+
+    def _tune(self):
+        """
+        Tune the port for short round trips
+        """
+        tuning = self.comm.tune()
+        self.comm.timeout = min(self.timeout, serial_tuning.response_timeout(self.baudrate, self.max_block))
+        self.parent.log.info("Writer - Tuned {} {}, timeout {:.3f}s".format(self.com_port, tuning, self.comm.timeout))
+
     def _parse_file(self, file_name):
         """
         Processes each parameter in a text file
         and sends the write command
         """
-        with open(file_name, 'r') as parm_file:
-            drive_model = ''
-            for line in parm_file:
-                if line == '\n':
-                    pass
-                elif line.startswith('*'):
-                    drive_model = line[1:].strip()
-                elif line.startswith('#'):
-                    pass
-                else:
-                    s = line.split(':')
-                    result = self._write_parameter(drive_model, int(s[0]), int(s[2]))
-                    if result:
-                        return True
+        drive_model, plan = self._compile_file(file_name)
+        return self._write_plan(drive_model, plan)
+
+    def _compile_file(self, file_name):
+        """
+        Read a text file into the drive model and a write
+        plan, a list of (parameter, value) in file order
+        """
+        return compile_file(file_name)
+
+    def _write_plan(self, model, plan, batch=False):
+        """
+        Write each parameter in the plan, stopping at the first
+        failure.  With batch, consecutive parameters are sent
+        together in a single write multiple registers request.
+        """
+        needs_reset = False
+        if self.plan_writes:
+            plan, needs_reset = planner.order(model, plan)
+
+        result = self._send_plan(model, plan, batch)
+        if not result and needs_reset:
+            self.parent.log.info("Writer - Drive needs a reset for the new settings to take effect")
+            if self.auto_reset:
+                result = self._reset_and_reconnect(model, plan)
+        return result
+
+    def _send_plan(self, model, plan, batch):
+        """
+        Send the plan as is
+        """
+        if batch:
+            writes = self._batch_plan(plan)
+        else:
+            writes = [(parameter, [value]) for parameter, value in plan]
+        if self.comm is not None:
+            self.comm.prepare(writes)
+
+        for start, values in writes:
+            if len(values) == 1:
+                result = self._write_parameter(model, start, values[0])
+            else:
+                result = self._write_block(model, start, values)
+            if result:
+                return True
+        return False
+
+    def _reset_and_reconnect(self, model, plan):
+        """
+        Have the drive reset, then make sure it answers at the
+        comm settings the plan gave it.  The port goes back to the
+        writer settings afterwards for the next drive.
+        """
+        baudrate, address = planner.comm_settings(model, plan, self.baudrate, self.comm.address)
+        self.parent.log.info("Writer - Resetting drive, reconnecting at {} baud node {}".format(baudrate, address))
+        with self.metrics.timer("prompt"):
+            if self.auto_detect:
+                self.watcher.wait_for_disconnect()
+            else:
+                messagebox.showinfo("Information", "Power cycle the drive to apply its new settings then press OK")
+
+        original = (self.comm.address, self.comm.baudrate)
+        self.comm.address = address
+        self.comm.baudrate = baudrate
+        try:
+            found = self.watcher.wait_for_drive(timeout=30)
+        finally:
+            self.comm.address, self.comm.baudrate = original
+
+        if not found:
+            self.parent.log.info("Writer - Drive didn't answer at its new settings")
+            return True
+        self.parent.log.info("Writer - Drive answered at its new settings")
         return False
 
+    def _batch_plan(self, plan):
+        """
+        Group a write plan into blocks of consecutive parameters,
+        keeping the plan order, returns a list of (start, [values])
+        """
+        return batch_plan(plan, self.max_block)
+
     def _write_parameter(self, model, parameter, value):
         """
         Write the individual parameter to the drive
         """
-        self.parent.log.info("Writer - Writing {} to parameter {}".format(value, parameter))
-        time.sleep(0.1)
+        self.parent.log.info("Writer - Writing %s to parameter %s", value, parameter)
+        return self._transact("write_register", parameter, value)
+
+    def _write_block(self, model, start, values):
+        """
+        Write a block of consecutive parameters in one request
+        """
+        self.parent.log.info("Writer - Writing %s parameters starting at %s", len(values), start)
+        return self._transact("write_registers", start, values)
+
+    def _transact(self, method, *args):
+        """
+        Call the transport method, retrying failures as the
+        retry policy allows.  When the budget runs out the user
+        is asked whether to keep trying.  Returns True on failure,
+        or when the write was cancelled.
+        """
+        self.retry_policy.reset()
+        if self.comm is None:
+            self._connect()
+
+        while True:
+            if self.cancelled:
+                self.parent.log.info("Writer - Write cancelled, not sending {} {}".format(method, args[0]))
+                return True
+            with self.metrics.timer("sleep"):
+                time.sleep(self.delay)
+            start = time.perf_counter()
+            try:
+                getattr(self.comm, method)(*args)
+                latency = time.perf_counter() - start
+                self.metrics.record_write(latency)
+                self.journal.parameter(self.current_drive, args[0], args[1], "ok", latency)
+                return False
+            except Exception as e:
+                latency = time.perf_counter() - start
+                kind = retry.classify(e)
+                self.metrics.record_write(latency, False, kind == retry.TIMEOUT)
+                self.journal.parameter(self.current_drive, args[0], args[1], kind, latency)
+                self.parent.log.warning("Writer - %s (%s)", e, kind)
+
+            wait = self.retry_policy.next_delay(kind)
+            if self.cancelled:
+                continue
+            if wait is None:
+                if not self._yes_or_no():
+                    return True
+                self.retry_policy.reset()
+                wait = 0
+
+            self.metrics.record_retry()
+            if kind == retry.PORT_GONE:
+                self._connect()
+            self._pause(wait)
+
+    def _pause(self, seconds):
+        """
+        Wait between retries, keeping the GUI alive so
+        the write can be cancelled
+        """
+        end = time.monotonic() + seconds
+        update = getattr(self.parent, "update", None)
+        while not self.cancelled and time.monotonic() < end:
+            if update:
+                update()
+            time.sleep(min(0.05, max(0.0, end - time.monotonic())))
+
+    def _export_metrics(self):
+        """
+        Save the run metrics next to the log file
+        """
         try:
-            self.comm.write_register(parameter, value)
-            return False
-        except Exception as e:
-            self.parent.log.info("Writer - {}".format(e))
-            return True
+            self.metrics.export_json(os.path.join(self.current_dir, "metrics.json"))
+            self.metrics.export_csv(os.path.join(self.current_dir, "metrics.csv"))
+            self.parent.log.info("Writer - Metrics saved to %s", self.current_dir)
+            self.parent.log.info("Writer - Round trip p50 %.1fms p99 %.1fms", self.metrics.percentile(50) * 1000,
+                                 self.metrics.percentile(99) * 1000)
+        except OSError as e:
+            self.parent.log.info("Writer - Failed to save metrics, %s", e)
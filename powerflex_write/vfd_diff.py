@@ -0,0 +1,135 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+from collections import OrderedDict
+from powerflex_write import parameter_list
+from powerflex_write import vfd
+
+"""
+Compare and merge .vfd files and drive backups offline.
+
+Both sides are read into a map of parameter to value, when a parameter
+shows up more than once the last value wins, same as writing the file
+would leave it.  diff lists the added, removed and changed parameters
+with their names from parameter_list.  delta keeps only what has to be
+written to take a drive from the old set to the new one, save it as a
+.vfd and the writer only sends the changes.  Removed parameters can't
+be unwritten, they are only reported.
+
+merge is a three way merge of two edited copies of the same base file,
+a parameter changed differently on both sides is a conflict and keeps
+the value from ours.
+
+    python tools.py diff old.vfd new.vfd --delta output/VFD_Delta.vfd
+    python tools.py merge base.vfd ours.vfd theirs.vfd --output merged.vfd
+"""
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+def load(file_name):
+    """
+    Read a .vfd file into (model, {parameter: value})
+    """
+    model, plan = vfd.compile_file(file_name)
+    return model, OrderedDict(plan)
+
+
+def parameter_name(model, parameter):
+    try:
+        return parameter_list.get_parameter_name(model, parameter)
+    except KeyError:
+        return "Unknown"
+
+
+def diff(old, new):
+    """
+    Differences between two parameter maps as a list of
+    (change, parameter, old value, new value)
+    """
+    changes = []
+    for parameter in sorted(set(old) | set(new)):
+        if parameter not in old:
+            changes.append((ADDED, parameter, None, new[parameter]))
+        elif parameter not in new:
+            changes.append((REMOVED, parameter, old[parameter], None))
+        elif old[parameter] != new[parameter]:
+            changes.append((CHANGED, parameter, old[parameter], new[parameter]))
+    return changes
+
+
+def delta(old, new):
+    """
+    Write plan taking a drive from old to new, in the
+    order the parameters appear in new
+    """
+    return [(p, v) for p, v in new.items() if old.get(p) != v]
+
+
+def merge(base, ours, theirs):
+    """
+    Three way merge, returns the merged map and a list
+    of conflicting parameters
+    """
+    merged = OrderedDict()
+    conflicts = []
+    for parameter in list(ours) + [p for p in theirs if p not in ours]:
+        b, o, t = base.get(parameter), ours.get(parameter), theirs.get(parameter)
+        if o == t or t == b:
+            value = o
+        elif o == b:
+            value = t
+        else:
+            conflicts.append(parameter)
+            value = o
+        if value is not None:
+            merged[parameter] = value
+    # parameters the other side deleted and we didn't touch
+    for parameter in [p for p in merged if p in base and p not in theirs and ours.get(p) == base[p]]:
+        del merged[parameter]
+    return merged, conflicts
+
+
+def save(file_name, model, parameters):
+    """
+    Save a parameter map or plan as a .vfd file
+    """
+    items = parameters.items() if hasattr(parameters, "items") else parameters
+    with open(file_name, "w") as f:
+        f.write("*{}\n".format(model))
+        for parameter, value in items:
+            f.write("{}:{}:{}\n".format(parameter, parameter_name(model, parameter), value))
+
+
+def report(model, changes):
+    """
+    Text report of a diff, one change per line
+    """
+    lines = []
+    for change, parameter, old, new in changes:
+        name = parameter_name(model, parameter)
+        if change == ADDED:
+            lines.append("+ {}:{}:{}".format(parameter, name, new))
+        elif change == REMOVED:
+            lines.append("- {}:{}:{}".format(parameter, name, old))
+        else:
+            lines.append("~ {}:{}:{} -> {}".format(parameter, name, old, new))
+    return "\n".join(lines)
@@ -0,0 +1,272 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+"""
+
+import argparse
+import json
+import logging
+import os
+import powerflex_write as pfw
+import sys
+import time
+
+"""
+Command line tools that don't need the gui.
+
+    python tools.py estimate output/ --baud 19200 --delay 0.05
+    python tools.py diff old.vfd new.vfd --delta output/VFD_Delta.vfd
+    python tools.py merge base.vfd ours.vfd theirs.vfd --output merged.vfd
+    python tools.py journal output/journal.jsonl
+    python tools.py pack output/ --prune
+    python tools.py fleet output output/completed backups --range 41:0:600
+    python tools.py simulate PF525
+    python tools.py rtt /dev/ttyUSB0 --baud 19200
+    python tools.py replay output/capture_20240521_101500.pfwcap
+"""
+
+
+def estimate(args):
+    """
+    Print the estimated write time of the .vfd files in a directory
+    """
+    drives = []
+    for drive in sorted(f for f in os.listdir(args.directory) if f.endswith(".vfd")):
+        model, plan = pfw.vfd.compile_file(os.path.join(args.directory, drive))
+        result = pfw.estimate.estimate_plan(pfw.planner.order(model, plan)[0], args.baud, args.delay, args.batch)
+        result["drive"] = drive
+        drives.append(result)
+    print(pfw.estimate.report(drives, args.baud, args.delay))
+    return 0
+
+
+def diff(args):
+    """
+    Print the differences between two .vfd files, optionally
+    saving the changes as a new .vfd file
+    """
+    old_model, old = pfw.vfd_diff.load(args.old)
+    model, new = pfw.vfd_diff.load(args.new)
+    if old_model != model:
+        sys.stderr.write("Models differ, {} and {}\n".format(old_model, model))
+        return 1
+
+    changes = pfw.vfd_diff.diff(old, new)
+    if changes:
+        print(pfw.vfd_diff.report(model, changes))
+    if args.delta:
+        pfw.vfd_diff.save(args.delta, model, pfw.vfd_diff.delta(old, new))
+    return 0
+
+
+def merge(args):
+    """
+    Three way merge of two edited copies of the same .vfd file,
+    conflicts keep ours and are listed
+    """
+    models = set()
+    sides = []
+    for file_name in (args.base, args.ours, args.theirs):
+        model, parameters = pfw.vfd_diff.load(file_name)
+        models.add(model)
+        sides.append(parameters)
+    if len(models) != 1:
+        sys.stderr.write("Models differ, {}\n".format(", ".join(sorted(models))))
+        return 1
+
+    model = models.pop()
+    merged, conflicts = pfw.vfd_diff.merge(*sides)
+    for parameter in conflicts:
+        print("conflict {}:{}: ours {}, theirs {}".format(
+            parameter, pfw.vfd_diff.parameter_name(model, parameter),
+            sides[1].get(parameter), sides[2].get(parameter)))
+    pfw.vfd_diff.save(args.output, model, merged)
+    return 1 if conflicts else 0
+
+
+def journal(args):
+    """
+    Print the throughput of each run in a journal
+    """
+    print(json.dumps(pfw.journal.report(args.file_name), indent=2))
+    return 0
+
+
+def fleet(args):
+    """
+    Check every .vfd file in the directories as one fleet
+    """
+    drives = pfw.fleet.load(args.directories, args.model)
+    for path, error in drives.errors:
+        sys.stderr.write("Failed to read {}, {}\n".format(path, error))
+    print("{} drives, {} parameters".format(len(drives), len(drives.parameters)))
+
+    limits = {}
+    for limit in args.range:
+        parameter, low, high = (int(x) for x in limit.split(":"))
+        limits[parameter] = (low, high)
+    for drive, parameter, value in drives.check_ranges(limits):
+        print("{} {} is {}, outside {}".format(drive, parameter, value, limits[parameter]))
+
+    outliers = drives.outliers(args.agreement)
+    if outliers:
+        print(pfw.fleet.report(drives, outliers))
+
+    if args.against:
+        for drive, parameter, old, new in drives.diff(pfw.fleet.load(args.against, args.model)):
+            print("{} {}: {} -> {}".format(drive, parameter, old, new))
+    return 0
+
+
+def pack(args):
+    """
+    Rewrite the .vfd files in a directory as shared bases
+    and per drive overrides
+    """
+    store = pfw.param_store.ParameterStore(args.directory)
+    print("Packed {} files".format(store.pack()))
+    if args.prune:
+        print("Removed {} unused bases".format(len(store.prune())))
+    return 0
+
+
+def rtt(args):
+    """
+    Print read round trip times before and after tuning the port
+    """
+    comm = pfw.transport.open_transport(args.port, args.address, args.baud, 0.5)
+    try:
+        for label in ("default", "tuned"):
+            if label == "tuned":
+                print("Tuning {}".format(comm.tune()))
+                comm.timeout = pfw.serial_tuning.response_timeout(args.baud)
+            times, failed = pfw.serial_tuning.round_trips(comm, pfw.hotplug.PROBE_REGISTER, args.samples)
+            times.sort()
+            if times:
+                print("{}: timeout {:.3f}s, p50 {:.1f}ms, p99 {:.1f}ms, {} failed".format(
+                    label, comm.timeout, times[len(times) // 2] * 1000,
+                    times[min(len(times) - 1, int(len(times) * 0.99))] * 1000, failed))
+            else:
+                print("{}: no answer from the drive".format(label))
+    finally:
+        comm.close()
+    return 0
+
+
+def replay(args):
+    """
+    Serve a capture as a fake drive until ctrl-c, or list its frames
+    """
+    if args.dump:
+        print(pfw.capture.dump(args.file_name))
+        return 0
+
+    from powerflex_write.replay import ReplaySlave
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    slave = ReplaySlave(args.file_name)
+    print(slave.start())
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        slave.stop()
+    return 0
+
+
+def simulate(args):
+    """
+    Serve a simulated drive until ctrl-c
+    """
+    # The simulator needs tty/termios, so only import it here
+    from powerflex_write.simulator import Simulator
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    sim = Simulator(args.model, baudrate=args.baud, latency=args.latency)
+    print(sim.start())
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sim.stop()
+    return 0
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="powerflex_write tools")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("estimate", help="estimate the time to write the .vfd files in a directory")
+    cmd.add_argument("directory", nargs="?", default="output")
+    cmd.add_argument("--baud", type=int, default=9600)
+    cmd.add_argument("--delay", type=float, default=0.1)
+    cmd.add_argument("--batch", action="store_true", help="send consecutive parameters together")
+    cmd.set_defaults(func=estimate)
+
+    cmd = commands.add_parser("diff", help="compare two .vfd files or drive backups")
+    cmd.add_argument("old")
+    cmd.add_argument("new")
+    cmd.add_argument("--delta", help="save the parameters that changed as a .vfd file")
+    cmd.set_defaults(func=diff)
+
+    cmd = commands.add_parser("merge", help="three way merge of two edited copies of a .vfd file")
+    cmd.add_argument("base")
+    cmd.add_argument("ours")
+    cmd.add_argument("theirs")
+    cmd.add_argument("--output", default="merged.vfd", help="where to save the merged file")
+    cmd.set_defaults(func=merge)
+
+    cmd = commands.add_parser("journal", help="throughput of each run in a journal")
+    cmd.add_argument("file_name", nargs="?", default="output/journal.jsonl")
+    cmd.set_defaults(func=journal)
+
+    cmd = commands.add_parser("fleet", help="range checks, outliers and diffs across many .vfd files")
+    cmd.add_argument("directories", nargs="*", default=["output", "output/completed"])
+    cmd.add_argument("--model", help="only drives of this model")
+    cmd.add_argument("--range", action="append", default=[], metavar="PARAM:LOW:HIGH")
+    cmd.add_argument("--agreement", type=float, default=0.8,
+                     help="share of drives that must agree before the rest are outliers")
+    cmd.add_argument("--against", nargs="+", help="directories to diff against, drives matched by file name")
+    cmd.set_defaults(func=fleet)
+
+    cmd = commands.add_parser("pack", help="keep the parameters .vfd files share once, in a base")
+    cmd.add_argument("directory", nargs="?", default="output")
+    cmd.add_argument("--prune", action="store_true", help="remove bases no file uses")
+    cmd.set_defaults(func=pack)
+
+    cmd = commands.add_parser("rtt", help="round trip times before and after tuning the serial port")
+    cmd.add_argument("port")
+    cmd.add_argument("--baud", type=int, default=9600)
+    cmd.add_argument("--address", type=int, default=100)
+    cmd.add_argument("--samples", type=int, default=20)
+    cmd.set_defaults(func=rtt)
+
+    cmd = commands.add_parser("replay", help="serve a captured session as a fake drive on a pty")
+    cmd.add_argument("file_name")
+    cmd.add_argument("--dump", action="store_true", help="list the captured frames instead")
+    cmd.set_defaults(func=replay)
+
+    cmd = commands.add_parser("simulate", help="serve a simulated drive on a pty")
+    cmd.add_argument("model", nargs="?", default="PF525")
+    cmd.add_argument("--baud", type=int, default=9600)
+    cmd.add_argument("--latency", type=float, default=0.0)
+    cmd.set_defaults(func=simulate)
+
+    args = arg_parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())